@@ -1,13 +1,23 @@
+import os
+from typing import Optional
 from langgraph.graph import StateGraph, END
 from app.agents.state import InterviewState
-from app.agents.nodes import interviewer_node, evaluator_node, summarizer_node
+from app.agents.nodes import interviewer_node, evaluator_node, summarizer_node, finalizer_node
 
-def build_graph():
+def build_graph(finalize_mode: Optional[str] = None):
+    """
+    finalize_mode "two_step" (default) runs evaluator -> summarizer after the last question;
+    "fast" runs the single-call finalizer instead, saving one Bedrock round trip.
+    """
+    finalize_mode = finalize_mode or os.getenv("FINALIZE_MODE", "two_step")
     workflow = StateGraph(InterviewState)
     
     workflow.add_node("interviewer", interviewer_node)
-    workflow.add_node("evaluator", evaluator_node)
-    workflow.add_node("summarizer", summarizer_node)
+    if finalize_mode == "fast":
+        workflow.add_node("finalizer", finalizer_node)
+    else:
+        workflow.add_node("evaluator", evaluator_node)
+        workflow.add_node("summarizer", summarizer_node)
     
     workflow.set_entry_point("interviewer")
     
@@ -27,10 +37,13 @@ def build_graph():
     # "interviewer" -> END (if count < 5)
     # "interviewer" -> "evaluator" (if count >= 5)
     
+    # The interviewer always asks for "evaluator"; in fast mode that means the finalizer.
+    finalize_entry = "finalizer" if finalize_mode == "fast" else "evaluator"
+
     def router(state: InterviewState):
         next_node = state.get("next_node")
         if next_node == "evaluator":
-            return "evaluator"
+            return finalize_entry
         return END # Stop to send response to user
 
     workflow.add_conditional_edges(
@@ -38,12 +51,15 @@ def build_graph():
         router,
         {
             END: END,
-            "evaluator": "evaluator"
+            finalize_entry: finalize_entry
         }
     )
     
-    workflow.add_edge("evaluator", "summarizer")
-    workflow.add_edge("summarizer", END)
+    if finalize_mode == "fast":
+        workflow.add_edge("finalizer", END)
+    else:
+        workflow.add_edge("evaluator", "summarizer")
+        workflow.add_edge("summarizer", END)
     
     return workflow.compile()
 
@@ -1,6 +1,6 @@
 import json
 from app.services.llm_service import llm_service
-from app.agents.prompts import INTERVIEWER_PROMPT, EVALUATOR_PROMPT, SUMMARIZER_PROMPT
+from app.agents.prompts import INTERVIEWER_PROMPT, EVALUATOR_PROMPT, SUMMARIZER_PROMPT, FINALIZER_PROMPT
 from app.agents.state import InterviewState
 
 def interviewer_node(state: InterviewState):
@@ -46,7 +46,8 @@ Status: You have asked {question_count} questions.
 Instruction: {additional_instruction} Do not switch to JSON mode yet. Output only the natural language response.
 """
 
-    response = llm_service.invoke_model(INTERVIEWER_PROMPT, prompt)
+    route = "interviewer_closing" if question_count >= 5 else "interviewer"
+    response = llm_service.invoke_model(INTERVIEWER_PROMPT, prompt, route=route)
     
     # Check if response contains JSON (interview termination)
     import re
@@ -70,6 +71,84 @@ Instruction: {additional_instruction} Do not switch to JSON mode yet. Output onl
         "next_node": "interviewer"
     }
 
+def _extract_json(response: str) -> dict:
+    """Parses a JSON object from an LLM response (fenced block, raw JSON or first {...last})."""
+    import re
+    json_match = re.search(r"```json(.*?)```", response, re.DOTALL)
+    try:
+        if json_match:
+            return json.loads(json_match.group(1).strip())
+        # Try to parse raw response if it's just JSON
+        return json.loads(response)
+    except:
+        # Try a more aggressive cleanup if simple load fails
+        try:
+            # Find the first { and last }
+            start = response.find('{')
+            end = response.rfind('}') + 1
+            if start != -1 and end != -1:
+                return json.loads(response[start:end])
+        except:
+            pass
+    return {}
+
+def _extract_json_field(response: str, field: str) -> dict:
+    """Parses the object under "field" even when the JSON after it was cut off at max_tokens."""
+    import re
+    match = re.search(r'"%s"\s*:\s*\{' % re.escape(field), response)
+    if not match:
+        return {}
+    try:
+        value, _ = json.JSONDecoder().raw_decode(response, match.end() - 1)
+    except ValueError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+def _attach_answers(evaluation: dict, messages: list) -> dict:
+    # The finalizer does not repeat the answers (to save output tokens); they are the
+    # candidate's last turns, one per evaluated question.
+    items = evaluation.get("evaluation_per_answer") or []
+    answers = [m.get("content", "") for m in messages if m.get("role") == "user"]
+    if items and len(answers) >= len(items):
+        for item, answer in zip(items, answers[-len(items):]):
+            if isinstance(item, dict) and not item.get("answer"):
+                item["answer"] = answer
+    return evaluation
+
+def _fallback_evaluation() -> dict:
+    return {
+        "evaluation_per_answer": [],
+        "section_scores": {
+            "hr_score": 0,
+            "technical_score": 0,
+            "communication_score": 0,
+            "confidence_score": 0,
+            "overall_score": 0
+        },
+        "red_flags": ["Evaluation generation failed"],
+        "final_verdict": "Consider",
+        "notes_for_summarizer": "The evaluator failed to produce a structured output. Please review the transcript."
+    }
+
+def _fallback_summary() -> dict:
+    return {
+        "short_summary": "We encountered an issue generating the summary.",
+        "detailed_summary": "Please review the raw interview data as the automated summary generation failed.",
+        "verdict": "Consider"
+    }
+
+def _attach_scores(summary: dict, evaluation: dict) -> dict:
+    # Merge scores from evaluation into the final summary for Frontend display
+    scores = evaluation.get("section_scores", {})
+    summary["technical_rating"] = scores.get("technical_score", 0)
+    summary["communication_rating"] = scores.get("communication_score", 0)
+    summary["confidence_score"] = scores.get("confidence_score", 0)
+    summary["overall_score"] = scores.get("overall_score", 0)
+
+    # Pass the detailed evaluation per answer for the "Technical Deep Dive" tab
+    summary["evaluation_per_answer"] = evaluation.get("evaluation_per_answer", [])
+    return summary
+
 def evaluator_node(state: InterviewState):
     interview_data = state.get('interview_data', {})
     
@@ -83,46 +162,14 @@ FULL TRANSCRIPT:
 
 Note: If INTERVIEW DATA is empty, please rely entirely on the FULL TRANSCRIPT to generate the evaluation.
 """
-    response = llm_service.invoke_model(EVALUATOR_PROMPT, prompt)
-    
-    # Extract JSON
-    import re
-    json_match = re.search(r"```json(.*?)```", response, re.DOTALL)
-    evaluation = {}
+    response = llm_service.invoke_model(EVALUATOR_PROMPT, prompt, route="evaluator")
     
-    try:
-        if json_match:
-            evaluation = json.loads(json_match.group(1).strip())
-        else:
-             # Try to parse raw response if it's just JSON
-             evaluation = json.loads(response)
-    except:
-        print("Failed to parse Evaluator JSON")
-        # Try a more aggressive cleanup if simple load fails
-        try:
-            # Find the first { and last }
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start != -1 and end != -1:
-                evaluation = json.loads(response[start:end])
-        except:
-            pass
+    evaluation = _extract_json(response)
 
     # Fallback if evaluation is still empty
     if not evaluation:
-        evaluation = {
-            "evaluation_per_answer": [],
-            "section_scores": {
-                "hr_score": 0,
-                "technical_score": 0,
-                "communication_score": 0,
-                "confidence_score": 0,
-                "overall_score": 0
-            },
-            "red_flags": ["Evaluation generation failed"],
-            "final_verdict": "Consider",
-            "notes_for_summarizer": "The evaluator failed to produce a structured output. Please review the transcript."
-        }
+        print("Failed to parse Evaluator JSON")
+        evaluation = _fallback_evaluation()
 
     return {"evaluation": evaluation, "next_node": "summarizer"}
 
@@ -134,41 +181,47 @@ def summarizer_node(state: InterviewState):
 EVALUATION DATA:
 {json.dumps(evaluation, indent=2)}
 """
-    response = llm_service.invoke_model(SUMMARIZER_PROMPT, prompt)
+    response = llm_service.invoke_model(SUMMARIZER_PROMPT, prompt, route="summarizer")
     
-    import re
-    json_match = re.search(r"```json(.*?)```", response, re.DOTALL)
-    summary = {}
-    
-    try:
-        if json_match:
-            summary = json.loads(json_match.group(1).strip())
-        else:
-            summary = json.loads(response)
-    except:
-        try:
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start != -1 and end != -1:
-                summary = json.loads(response[start:end])
-        except:
-             pass
+    summary = _extract_json(response)
              
     if not summary:
-        summary = {
-            "short_summary": "We encountered an issue generating the summary.",
-            "detailed_summary": "Please review the raw interview data as the automated summary generation failed.",
-            "verdict": "Consider"
-        }
-    
-    # Merge scores from evaluation into the final summary for Frontend display
-    scores = evaluation.get("section_scores", {})
-    summary["technical_rating"] = scores.get("technical_score", 0)
-    summary["communication_rating"] = scores.get("communication_score", 0)
-    summary["confidence_score"] = scores.get("confidence_score", 0)
-    summary["overall_score"] = scores.get("overall_score", 0)
+        summary = _fallback_summary()
 
-    # Pass the detailed evaluation per answer for the "Technical Deep Dive" tab
-    summary["evaluation_per_answer"] = evaluation.get("evaluation_per_answer", [])
+    return {"summary": _attach_scores(summary, evaluation), "next_node": "END"}
+
+def finalizer_node(state: InterviewState):
+    """One-shot variant of evaluator_node + summarizer_node: a single LLM call returns both."""
+    interview_data = state.get('interview_data', {})
+
+    prompt = f"""{FINALIZER_PROMPT}
+
+INTERVIEW DATA:
+{json.dumps(interview_data, indent=2)}
+
+FULL TRANSCRIPT:
+{state['messages']}
+
+Note: If INTERVIEW DATA is empty, please rely entirely on the FULL TRANSCRIPT to generate the evaluation.
+"""
+    response = llm_service.invoke_model(FINALIZER_PROMPT, prompt, route="finalizer")
+
+    result = _extract_json(response)
+    if not isinstance(result, dict):
+        result = {}
+    evaluation = result.get("evaluation") if isinstance(result.get("evaluation"), dict) else {}
+    summary = result.get("summary") if isinstance(result.get("summary"), dict) else {}
+
+    if not evaluation:
+        # The evaluation comes first, so it usually survives an output cut off inside the summary.
+        evaluation = _extract_json_field(response, "evaluation")
+    if not evaluation:
+        print("Failed to parse Finalizer evaluation JSON")
+        evaluation = _fallback_evaluation()
+        return {"evaluation": evaluation, "summary": _attach_scores(_fallback_summary(), evaluation), "next_node": "END"}
+    evaluation = _attach_answers(evaluation, state['messages'])
+    if not summary:
+        print("Finalizer summary missing, generating it with the summarizer")
+        return {"evaluation": evaluation, **summarizer_node({**state, "evaluation": evaluation})}
 
-    return {"summary": summary, "next_node": "END"}
+    return {"evaluation": evaluation, "summary": _attach_scores(summary, evaluation), "next_node": "END"}
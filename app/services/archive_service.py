@@ -0,0 +1,256 @@
+"""
+Cold storage for old interview reports.
+
+Reports are moved out of Chroma into immutable segment files:
+  seg-NNNNNN.log  zlib-compressed JSON records, each prefixed with its length
+  seg-NNNNNN.idx  open-addressing hash table (id hash -> offset, length),
+                  memory-mapped so a lookup is a couple of page reads
+Segments are written once (to a temp file, then renamed) and never modified;
+compaction merges them into a new segment and removes the old ones.
+
+CLI:
+    python -m app.services.archive_service archive --days 90 --server-stopped
+    python -m app.services.archive_service compact
+    python -m app.services.archive_service stats
+"""
+import os
+import sys
+import json
+import mmap
+import zlib
+import time
+import struct
+import hashlib
+import argparse
+import threading
+from typing import Optional
+
+if __name__ == "__main__":
+    # As a CLI, read .env like the server and rescore.py do; ArchiveService and
+    # StorageService read ARCHIVE_DIR / CHROMA_DB_PATH when they are created.
+    from dotenv import load_dotenv
+    load_dotenv()
+
+INDEX_MAGIC = b"IVIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sIQ")   # magic, version, slot count
+INDEX_SLOT = struct.Struct("<QQI4x")    # id hash (0 = empty), record offset, payload length
+RECORD_HEADER = struct.Struct("<I")     # compressed payload length
+
+
+def _id_hash(report_id: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(report_id.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class Segment:
+    def __init__(self, log_path: str, idx_path: str):
+        self.log_path = log_path
+        self.idx_path = idx_path
+        # mmap keeps its own descriptor, so the files can be closed straight away.
+        with open(log_path, "rb") as log_file, open(idx_path, "rb") as idx_file:
+            self.log = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(log_path) else b""
+            self.idx = mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_count = INDEX_HEADER.unpack_from(self.idx, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Unsupported archive index {idx_path}")
+
+    def get(self, report_id: str) -> Optional[dict]:
+        key = _id_hash(report_id)
+        slot = key & (self.slot_count - 1)
+        for _ in range(self.slot_count):
+            slot_key, offset, length = INDEX_SLOT.unpack_from(self.idx, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if slot_key == 0:
+                return None
+            if slot_key == key:
+                record = self._read(offset, length)
+                # Guard against 64-bit hash collisions.
+                if record["id"] == report_id:
+                    return record
+            slot = (slot + 1) & (self.slot_count - 1)
+        return None
+
+    def _read(self, offset: int, length: int) -> dict:
+        start = offset + RECORD_HEADER.size
+        return json.loads(zlib.decompress(self.log[start:start + length]))
+
+    def __iter__(self):
+        offset = 0
+        while offset < len(self.log):
+            (length,) = RECORD_HEADER.unpack_from(self.log, offset)
+            yield self._read(offset, length)
+            offset += RECORD_HEADER.size + length
+
+    def close(self):
+        if self.log:
+            self.log.close()
+        self.idx.close()
+
+
+class ArchiveService:
+    def __init__(self):
+        self.archive_dir = os.getenv("ARCHIVE_DIR", "./archive_data")
+        self.compression_level = int(os.getenv("ARCHIVE_COMPRESSION_LEVEL", "6"))
+        self._segments = []
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+
+    def _segment_names(self) -> list:
+        if not os.path.isdir(self.archive_dir):
+            return []
+        # A segment is only visible once its index exists; the index is renamed into place last.
+        return sorted(n[:-len(".idx")] for n in os.listdir(self.archive_dir) if n.startswith("seg-") and n.endswith(".idx"))
+
+    def _load_segments(self) -> list:
+        """Open segments, newest first. Reloaded when another process adds or removes segments."""
+        try:
+            mtime = os.stat(self.archive_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if mtime != self._dir_mtime:
+                # Other threads may still be reading the old segments, so they are not
+                # closed here; their mmaps are released once the last reader drops them.
+                self._segments = [
+                    Segment(os.path.join(self.archive_dir, name + ".log"), os.path.join(self.archive_dir, name + ".idx"))
+                    for name in reversed(self._segment_names())
+                ]
+                self._dir_mtime = mtime
+            return list(self._segments)
+
+    def get(self, report_id: str) -> Optional[dict]:
+        for segment in self._load_segments():
+            record = segment.get(report_id)
+            if record is not None:
+                return record["data"]
+        return None
+
+    def write_segment(self, records) -> Optional[str]:
+        """
+        Writes an iterable of (report_id, data, stored_at) records as a new sealed
+        segment. Returns the segment name; the records are durable once this returns.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        existing = self._segment_names()
+        number = int(existing[-1].split("-")[1]) + 1 if existing else 1
+        name = f"seg-{number:06d}"
+        log_path = os.path.join(self.archive_dir, name + ".log")
+        idx_path = os.path.join(self.archive_dir, name + ".idx")
+
+        entries = []
+        offset = 0
+        with open(log_path + ".tmp", "wb") as f:
+            for report_id, data, stored_at in records:
+                payload = zlib.compress(
+                    json.dumps({"id": report_id, "stored_at": stored_at, "archived_at": time.time(), "data": data}).encode("utf-8"),
+                    self.compression_level
+                )
+                f.write(RECORD_HEADER.pack(len(payload)))
+                f.write(payload)
+                entries.append((_id_hash(report_id), offset, len(payload)))
+                offset += RECORD_HEADER.size + len(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if not entries:
+            os.remove(log_path + ".tmp")
+            return None
+
+        # Load factor <= 0.5 keeps linear probes short.
+        slot_count = 1
+        while slot_count < len(entries) * 2:
+            slot_count *= 2
+        table = bytearray(INDEX_HEADER.size + slot_count * INDEX_SLOT.size)
+        INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, INDEX_VERSION, slot_count)
+        for key, record_offset, length in entries:
+            slot = key & (slot_count - 1)
+            while INDEX_SLOT.unpack_from(table, INDEX_HEADER.size + slot * INDEX_SLOT.size)[0] != 0:
+                slot = (slot + 1) & (slot_count - 1)
+            INDEX_SLOT.pack_into(table, INDEX_HEADER.size + slot * INDEX_SLOT.size, key, record_offset, length)
+        with open(idx_path + ".tmp", "wb") as f:
+            f.write(table)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(log_path + ".tmp", log_path)
+        os.replace(idx_path + ".tmp", idx_path)
+        return name
+
+    def compact(self) -> dict:
+        """Merges all segments into one, keeping the newest copy of each report."""
+        segments = self._load_segments()
+        if len(segments) < 2:
+            return {"merged_segments": 0}
+        # First pass: which segment holds the newest copy of each report.
+        newest = {}
+        for position, segment in enumerate(segments):  # newest first
+            for record in segment:
+                newest.setdefault(record["id"], position)
+
+        def surviving_records():
+            # Second pass streams records so compaction never holds the archive in memory.
+            for position in range(len(segments) - 1, -1, -1):
+                for record in segments[position]:
+                    if newest.get(record["id"]) == position:
+                        del newest[record["id"]]
+                        yield record["id"], record["data"], record.get("stored_at")
+
+        records = len(newest)
+        name = self.write_segment(surviving_records())
+        for segment in segments:
+            os.remove(segment.idx_path)
+            os.remove(segment.log_path)
+        self._load_segments()
+        return {"merged_segments": len(segments), "segment": name, "records": records}
+
+    def stats(self) -> dict:
+        segments = self._load_segments()
+        log_bytes = sum(os.path.getsize(s.log_path) for s in segments)
+        idx_bytes = sum(os.path.getsize(s.idx_path) for s in segments)
+        records = 0
+        raw_bytes = 0
+        for segment in segments:
+            for record in segment:
+                records += 1
+                raw_bytes += len(json.dumps(record["data"]))
+        return {
+            "segments": len(segments),
+            "records": records,
+            "log_bytes": log_bytes,
+            "index_bytes": idx_bytes,
+            "uncompressed_bytes": raw_bytes,
+            "compression_ratio": round(raw_bytes / log_bytes, 2) if log_bytes else None,
+        }
+
+archive_service = ArchiveService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview report archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    archive = sub.add_parser("archive", help="Move reports older than --days from Chroma into a new segment")
+    archive.add_argument("--days", type=float, default=float(os.getenv("ARCHIVE_AFTER_DAYS", "90")))
+    archive.add_argument("--batch-size", type=int, default=5000, help="Maximum reports per segment")
+    archive.add_argument("--server-stopped", action="store_true",
+                         help="Confirm the API server is not running (it must be the only Chroma writer)")
+    sub.add_parser("compact", help="Merge all segments into one")
+    sub.add_parser("stats", help="Print archive size")
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        if not args.server_stopped:
+            # Chroma does not support several writer processes; deleting here while the
+            # server holds its own client and HNSW index leaves its search index stale.
+            parser.error("archive writes to Chroma: use POST /admin/archive on the running server, "
+                         "or stop the server and pass --server-stopped")
+        from app.services.storage_service import storage_service
+        result = storage_service.archive_older_than(args.days, batch_size=args.batch_size)
+    elif args.command == "compact":
+        result = archive_service.compact()
+    else:
+        result = archive_service.stats()
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import re
+from typing import Optional
+
+# Canonical skill name -> alternative spellings. Every entry (canonical included)
+# is tokenized once at import time and loaded into a token trie, so matching a
+# document is a single left-to-right pass regardless of vocabulary size.
+SKILL_VOCABULARY = {
+    # Languages
+    "Python": ["python3"],
+    "Java": [],
+    "JavaScript": ["js", "ecmascript"],
+    "TypeScript": ["ts"],
+    "Go": ["golang"],
+    "Rust": [],
+    "C": [],
+    "C++": ["cpp"],
+    "C#": ["csharp"],
+    "Kotlin": [],
+    "Swift": [],
+    "Scala": [],
+    "Ruby": [],
+    "PHP": [],
+    "R": [],
+    "SQL": [],
+    "Bash": ["shell scripting"],
+    # Web / backend
+    "React": ["react.js", "reactjs"],
+    "Angular": ["angularjs"],
+    "Vue": ["vue.js", "vuejs"],
+    "Node.js": ["node", "nodejs"],
+    "Express": ["express.js"],
+    "Next.js": ["nextjs"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": [],
+    "Spring Boot": ["spring"],
+    ".NET": ["dotnet", "asp.net"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "REST": ["rest api", "restful", "rest apis"],
+    "GraphQL": [],
+    "gRPC": [],
+    "Microservices": ["microservice"],
+    # Data stores / messaging
+    "PostgreSQL": ["postgres"],
+    "MySQL": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search"],
+    "DynamoDB": [],
+    "Cassandra": [],
+    "Kafka": ["apache kafka"],
+    "RabbitMQ": [],
+    "Snowflake": [],
+    # Cloud / DevOps
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Docker": [],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "Jenkins": [],
+    "CI/CD": ["ci cd", "continuous integration", "continuous delivery"],
+    "Git": ["github", "gitlab"],
+    "Linux": ["unix"],
+    # No "aws lambda" / "aws s3" aliases: longest match would consume the "aws" token,
+    # so "AWS Lambda" would not count as AWS. Matched separately, it yields both skills.
+    "Lambda": [],
+    "S3": [],
+    "EC2": [],
+    # Data / ML
+    "Machine Learning": ["ml"],
+    "Deep Learning": [],
+    "NLP": ["natural language processing"],
+    "Computer Vision": [],
+    "LLM": ["llms", "large language models", "large language model"],
+    "PyTorch": [],
+    "TensorFlow": [],
+    "scikit-learn": ["sklearn"],
+    "Pandas": [],
+    "NumPy": [],
+    "Spark": ["pyspark", "apache spark"],
+    "Airflow": ["apache airflow"],
+    "Hadoop": [],
+    "Tableau": [],
+    "Power BI": ["powerbi"],
+    "LangChain": [],
+    "Data Structures": [],
+    "Algorithms": [],
+    # Practices / soft skills
+    "Agile": ["scrum"],
+    "Unit Testing": ["unit tests", "pytest", "junit", "jest"],
+    "System Design": [],
+    "Communication": ["communication skills"],
+    "Leadership": ["team lead", "mentoring"],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+# A standalone ".NET" would tokenize to the far too ambiguous "net"; it is rewritten
+# to "dotnet" first ("asp.net" is left alone and matched as a whole token).
+_DOTNET_RE = re.compile(r"(?<![\w.])\.net\b")
+# Compound tokens such as "c/c++", "python/django" or "react.experience" (a missing
+# space after a full stop) are split on these, outer separator first, unless the
+# whole token is a vocabulary entry like "ci/cd", "node.js" or "asp.net".
+_COMPOUND_SEPARATORS = (re.compile(r"/"), re.compile(r"\.(?=[a-z])"))
+
+# Single-letter and very common words only count as skills when the JD writes them
+# in a skill-list context; matching them in free text produces too many false hits.
+_AMBIGUOUS_TOKENS = {"c", "r", "go", "ts", "node", "spring", "express", "ml", "git", "swift", "rest"}
+
+
+def _tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(_DOTNET_RE.sub("dotnet", text.lower()))
+
+
+class _TrieNode:
+    __slots__ = ("children", "skill")
+
+    def __init__(self):
+        self.children = {}
+        self.skill = None
+
+
+class ATSPrefilter:
+    """
+    Deterministic keyword scoring run before the ATS LLM call.
+    Extracts known skills from the JD and resume with a token trie and scores the
+    resume by the fraction of JD skills it covers.
+    """
+
+    def __init__(self, vocabulary: dict = SKILL_VOCABULARY):
+        self.root = _TrieNode()
+        for skill, aliases in vocabulary.items():
+            for phrase in [skill] + list(aliases):
+                tokens = _tokenize(phrase)
+                node = self.root
+                for token in tokens:
+                    node = node.children.setdefault(token, _TrieNode())
+                node.skill = skill
+
+        # Below reject_threshold the resume is rejected without calling the LLM.
+        # At or above accept_threshold it is accepted without calling the LLM
+        # (defaults above 100, i.e. disabled, since acceptance needs the LLM's judgement).
+        self.reject_threshold = float(os.getenv("ATS_PREFILTER_REJECT_THRESHOLD", "25"))
+        self.accept_threshold = float(os.getenv("ATS_PREFILTER_ACCEPT_THRESHOLD", "101"))
+        # JDs mentioning fewer known skills than this are too vague to pre-score.
+        self.min_jd_skills = int(os.getenv("ATS_PREFILTER_MIN_JD_SKILLS", "3"))
+
+    def _split_compound(self, token: str) -> list:
+        if token in self.root.children:
+            return [token]
+        for separator in _COMPOUND_SEPARATORS:
+            parts = [part for part in separator.split(token) if part]
+            if len(parts) > 1:
+                return [t for part in parts for t in self._split_compound(part)]
+        return [token]
+
+    def extract_skills(self, text: str) -> set:
+        tokens = [t for token in _tokenize(text) for t in self._split_compound(token)]
+        found = set()
+        i = 0
+        while i < len(tokens):
+            # Longest match starting at token i, e.g. "google cloud platform" over "google cloud".
+            node = self.root
+            match_skill, match_len = None, 0
+            j = i
+            while j < len(tokens) and tokens[j] in node.children:
+                node = node.children[tokens[j]]
+                j += 1
+                if node.skill:
+                    match_skill, match_len = node.skill, j - i
+            if not match_skill:
+                i += 1
+                continue
+            if match_len > 1 or tokens[i] not in _AMBIGUOUS_TOKENS or self._is_listed(tokens, i):
+                found.add(match_skill)
+            if match_len > 1:
+                # A phrase also names the skills it is built from, e.g. "Tailwind CSS" -> CSS.
+                for token in tokens[i:i + match_len]:
+                    node = self.root.children.get(token)
+                    if node is not None and node.skill and token not in _AMBIGUOUS_TOKENS:
+                        found.add(node.skill)
+            i += match_len
+        return found
+
+    def _is_listed(self, tokens: list, i: int) -> bool:
+        # Ambiguous single tokens count when they sit next to an unambiguous skill
+        # token, e.g. "Python, Go, Rust" (punctuation is dropped by the tokenizer).
+        return any(t in self.root.children and self.root.children[t].skill and t not in _AMBIGUOUS_TOKENS
+                   for t in tokens[max(0, i - 1):i] + tokens[i + 1:i + 2])
+
+    def score(self, job_description: str, resume_text: str) -> dict:
+        jd_skills = self.extract_skills(job_description)
+        resume_skills = self.extract_skills(resume_text)
+        matched = jd_skills & resume_skills
+        missing = sorted(jd_skills - resume_skills)
+
+        match_percentage: Optional[int] = None
+        if len(jd_skills) >= self.min_jd_skills:
+            match_percentage = round(100 * len(matched) / len(jd_skills))
+
+        return {
+            "match_percentage": match_percentage,
+            "jd_skills": sorted(jd_skills),
+            "matched_keywords": sorted(matched),
+            "missing_keywords": missing,
+        }
+
+    def decide(self, prescore: dict) -> str:
+        """Returns "reject", "accept" or "llm" for a result of score()."""
+        match_percentage = prescore.get("match_percentage")
+        if match_percentage is None:
+            return "llm"
+        if match_percentage < self.reject_threshold:
+            return "reject"
+        if match_percentage >= self.accept_threshold:
+            return "accept"
+        return "llm"
+
+    def build_result(self, prescore: dict, decision: str) -> dict:
+        """Builds an /ats/evaluate response (same shape as the LLM's) for a decided resume."""
+        matched = prescore["matched_keywords"]
+        missing = prescore["missing_keywords"]
+        match_percentage = prescore["match_percentage"]
+        if decision == "reject":
+            summary = (
+                f"The resume covers {len(matched)} of {len(prescore['jd_skills'])} skills required by the job description ({match_percentage}%). "
+                f"Key requirements such as {', '.join(missing[:5])} are not mentioned. "
+                "The resume was screened out by the keyword pre-filter before detailed analysis."
+            )
+            recommendation = "Add concrete project experience for the missing skills, using the same terminology as the job description."
+        else:
+            summary = (
+                f"The resume covers {len(matched)} of {len(prescore['jd_skills'])} skills required by the job description ({match_percentage}%). "
+                "It was accepted by the keyword pre-filter without detailed analysis."
+            )
+            recommendation = "Quantify achievements for the matched skills to strengthen the resume further."
+        return {
+            "match_percentage": match_percentage,
+            "status": "Qualified" if match_percentage >= 80 else "Not Qualified",
+            "missing_keywords": missing,
+            "analysis_summary": summary,
+            "recommendation": recommendation,
+        }
+
+ats_prefilter = ATSPrefilter()
@@ -1,56 +1,195 @@
 import boto3
 import json
 import os
+import time
+import threading
+from botocore.config import Config
 from typing import Optional
 
+# Per-call-site defaults. Every value can be overridden with <ROUTE>_MODEL_ID,
+# <ROUTE>_FALLBACK_MODEL_ID, <ROUTE>_MAX_TOKENS, <ROUTE>_TEMPERATURE,
+# <ROUTE>_TIMEOUT_SECONDS, <ROUTE>_PROMPT_FORMAT and <ROUTE>_FALLBACK_PROMPT_FORMAT
+# (e.g. INTERVIEWER_MODEL_ID).
+# timeout_seconds is per model call and sized for the default BEDROCK_MODEL_ID (Llama 3 70B,
+# non-streaming). A call that exceeds it is retried on the fallback model with a fresh budget,
+# so the worst case is twice the value. Lower it together with a faster <ROUTE>_MODEL_ID.
+ROUTE_DEFAULTS = {
+    # Latency critical: the candidate is waiting for the next question.
+    "interviewer": {"max_tokens": 1024, "temperature": 0.7, "timeout_seconds": 30},
+    # The last interviewer turn also emits the JSON memory, so it needs a bigger budget.
+    # Uses the interviewer's model unless INTERVIEWER_CLOSING_MODEL_ID is set.
+    "interviewer_closing": {"max_tokens": 2048, "temperature": 0.7, "timeout_seconds": 60},
+    # Quality critical: run on the primary model with a generous budget.
+    "evaluator": {"max_tokens": 2048, "temperature": 0.2, "timeout_seconds": 60},
+    "summarizer": {"max_tokens": 1536, "temperature": 0.4, "timeout_seconds": 45},
+    # Evaluation + summary in one call (FINALIZE_MODE=fast); Llama 3 caps generation at 2048.
+    "finalizer": {"max_tokens": 2048, "temperature": 0.2, "timeout_seconds": 90},
+    "ats": {"max_tokens": 1024, "temperature": 0.2, "timeout_seconds": 30},
+    "default": {"max_tokens": 2048, "temperature": 0.7, "timeout_seconds": 60},
+}
+
+DEFAULT_FALLBACK_MODEL_ID = "meta.llama3-8b-instruct-v1:0"
+# Bedrock rejects Llama 3 requests with a larger max_gen_len.
+LLAMA3_MAX_GEN_LEN = 2048
+
+
+class ModelRoute:
+    def __init__(self, name: str, default_model_id: str):
+        defaults = ROUTE_DEFAULTS.get(name, ROUTE_DEFAULTS["default"])
+        prefix = name.upper()
+        self.name = name
+        self.model_id = os.getenv(f"{prefix}_MODEL_ID", default_model_id)
+        self.fallback_model_id = os.getenv(
+            f"{prefix}_FALLBACK_MODEL_ID",
+            os.getenv("BEDROCK_FALLBACK_MODEL_ID", DEFAULT_FALLBACK_MODEL_ID)
+        )
+        self.max_tokens = int(os.getenv(f"{prefix}_MAX_TOKENS", defaults["max_tokens"]))
+        self.temperature = float(os.getenv(f"{prefix}_TEMPERATURE", defaults["temperature"]))
+        self.timeout_seconds = float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", defaults["timeout_seconds"]))
+        # "llama3" or "mistral"; empty means infer from the model id.
+        self.prompt_format = os.getenv(f"{prefix}_PROMPT_FORMAT", "")
+        self.fallback_prompt_format = os.getenv(f"{prefix}_FALLBACK_PROMPT_FORMAT", "")
+
+    def prompt_format_for(self, model_id: str) -> str:
+        """Prompt/response format of model_id on this route; overrides only apply to their own model."""
+        if model_id == self.model_id:
+            override = self.prompt_format
+        elif model_id == self.fallback_model_id:
+            override = self.fallback_prompt_format
+        else:
+            override = ""
+        return override or ("mistral" if "mistral" in model_id else "llama3")
+
+
 class LLMService:
     def __init__(self):
-        self.bedrock_runtime = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=os.getenv("AWS_REGION"),
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-        )
         self.model_id = os.getenv("BEDROCK_MODEL_ID", "meta.llama3-70b-instruct-v1:0")
+        self.routes = {name: ModelRoute(name, self.model_id) for name in ROUTE_DEFAULTS}
+        self.routes["interviewer_closing"] = ModelRoute("interviewer_closing", self.routes["interviewer"].model_id)
+        # One client per latency budget: botocore enforces the budget as a read
+        # timeout, so a slow call is actually abandoned instead of left running.
+        self._budget_clients = {}
+        self._clients_lock = threading.Lock()
+        # Cumulative token usage per model id, for cost reporting.
+        self.usage = {}
+        self._usage_lock = threading.Lock()
+        # Which model answered the last invoke_model call, per calling thread.
+        self._last_call = threading.local()
+
+    def _client_for_budget(self, timeout_seconds: float):
+        client = self._budget_clients.get(timeout_seconds)
+        if client is not None:
+            return client
+        # boto3's default session is not thread-safe when creating clients.
+        with self._clients_lock:
+            client = self._budget_clients.get(timeout_seconds)
+            if client is not None:
+                return client
+            client = boto3.client(
+                service_name='bedrock-runtime',
+                region_name=os.getenv("AWS_REGION"),
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                config=Config(
+                    connect_timeout=min(timeout_seconds, 5),
+                    read_timeout=timeout_seconds,
+                    retries={"max_attempts": 0}
+                )
+            )
+            self._budget_clients[timeout_seconds] = client
+        return client
+
+    def _record_usage(self, model_id: str, response: dict):
+        # Bedrock reports token counts for every model family in these headers.
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        input_tokens = int(headers.get("x-amzn-bedrock-input-token-count", 0) or 0)
+        output_tokens = int(headers.get("x-amzn-bedrock-output-token-count", 0) or 0)
+        with self._usage_lock:
+            usage = self.usage.setdefault(model_id, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+            usage["calls"] += 1
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+
+    def last_call(self) -> dict:
+        """
+        Route, answering model id and error of this thread's last invoke_model call.
+        model_id is None when every model failed (invoke_model then returned the error text).
+        """
+        return dict(getattr(self._last_call, "info", {}))
 
-    def invoke_model(self, system_prompt: str, user_message: str, max_tokens: int = 2048, temperature: float = 0.7) -> str:
-        if "mistral" in self.model_id:
+    def _build_body(self, prompt_format: str, system_prompt: str, user_message: str, max_tokens: int, temperature: float) -> str:
+        if prompt_format == "mistral":
             prompt = f"<s>[INST] {system_prompt} \n\n {user_message} [/INST]"
-            body = json.dumps({
+            return json.dumps({
                 "prompt": prompt,
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "top_p": 0.9
             })
-        else:
-            # Metadata assumption: Llama 3
-            prompt = f"""
+        # Metadata assumption: Llama 3
+        prompt = f"""
 <|begin_of_text|><|start_header_id|>system<|end_header_id|>
 {system_prompt}
 <|eot_id|><|start_header_id|>user<|end_header_id|>
 {user_message}
 <|eot_id|><|start_header_id|>assistant<|end_header_id|>
 """
-            body = json.dumps({
-                "prompt": prompt,
-                "max_gen_len": max_tokens,
-                "temperature": temperature,
-                "top_p": 0.9
-            })
+        return json.dumps({
+            "prompt": prompt,
+            "max_gen_len": min(max_tokens, LLAMA3_MAX_GEN_LEN),
+            "temperature": temperature,
+            "top_p": 0.9
+        })
 
+    def _call(self, route: ModelRoute, model_id: str, system_prompt: str, user_message: str, max_tokens: int, temperature: float) -> str:
+        prompt_format = route.prompt_format_for(model_id)
+        body = self._build_body(prompt_format, system_prompt, user_message, max_tokens, temperature)
+        response = self._client_for_budget(route.timeout_seconds).invoke_model(
+            modelId=model_id,
+            body=body
+        )
+        response_body = json.loads(response.get('body').read())
+        self._record_usage(model_id, response)
+        if prompt_format == "mistral":
+            text = (response_body.get('outputs') or [{}])[0].get('text')
+        else:
+            text = response_body.get('generation')
+        if text is None:
+            # Usually a wrong <ROUTE>_PROMPT_FORMAT; treated like any other failed call.
+            raise ValueError(f"No {prompt_format} completion in response from {model_id}")
+        return text
+
+    def invoke_model(
+        self,
+        system_prompt: str,
+        user_message: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        route: str = "default"
+    ) -> str:
+        model_route = self.routes.get(route, self.routes["default"])
+        max_tokens = max_tokens or model_route.max_tokens
+        temperature = model_route.temperature if temperature is None else temperature
+
+        started = time.time()
         try:
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=body
-            )
-            response_body = json.loads(response.get('body').read())
-            
-            if "mistral" in self.model_id:
-                return response_body.get('outputs')[0].get('text')
-            else:
-                return response_body.get('generation')
+            response = self._call(model_route, model_route.model_id, system_prompt, user_message, max_tokens, temperature)
+            self._last_call.info = {"route": route, "model_id": model_route.model_id, "error": None}
+            return response
+        except Exception as e:
+            print(f"Error invoking Bedrock model {model_route.model_id} for '{route}' after {time.time() - started:.1f}s: {e}")
+            if not model_route.fallback_model_id or model_route.fallback_model_id == model_route.model_id:
+                self._last_call.info = {"route": route, "model_id": None, "error": str(e)}
+                return str(e)
+
+        try:
+            print(f"DEBUG: Falling back to {model_route.fallback_model_id} for '{route}'")
+            response = self._call(model_route, model_route.fallback_model_id, system_prompt, user_message, max_tokens, temperature)
+            self._last_call.info = {"route": route, "model_id": model_route.fallback_model_id, "error": None}
+            return response
         except Exception as e:
-            print(f"Error invoking Bedrock model: {e}")
+            print(f"Error invoking Bedrock fallback model {model_route.fallback_model_id}: {e}")
+            self._last_call.info = {"route": route, "model_id": None, "error": str(e)}
             return str(e)
 
 llm_service = LLMService()
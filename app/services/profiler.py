@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack at a fixed interval while running.
+    Produces two folded-stack profiles (one "frame;frame;frame count" line per
+    stack, the input format of flamegraph.pl and speedscope):
+      - wall: one count per sample, whether the thread was running or waiting
+      - cpu: per-thread CPU microseconds spent since the previous sample
+    Threads are the process's threads, so work from concurrent requests shows up
+    under its own thread name.
+    """
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.samples = 0
+        self._cpu_clock = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.time()
+        self.process_cpu_started = time.process_time()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.time() - self.started
+        self.process_cpu = time.process_time() - self.process_cpu_started
+
+    def _thread_cpu(self, ident: int) -> Optional[float]:
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            # Not available on this platform, or the thread just exited.
+            return None
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                folded = ";".join(reversed(stack))
+                self.wall[folded] += 1
+
+                cpu_now = self._thread_cpu(ident)
+                if cpu_now is not None:
+                    previous = self._cpu_clock.get(ident)
+                    self._cpu_clock[ident] = cpu_now
+                    if previous is not None and cpu_now > previous:
+                        self.cpu[folded] += int((cpu_now - previous) * 1_000_000)
+            self.samples += 1
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and stores the results.
+    A request is profiled when it sends `X-Profile: <PROFILE_TOKEN>` or is picked
+    by PROFILE_SAMPLE_RATE. Only one request is profiled at a time.
+    """
+
+    def __init__(self):
+        self.token = os.getenv("PROFILE_TOKEN", "")
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+        self.profile_dir = os.getenv("PROFILE_DIR", "./profiles")
+        self.max_profiles = int(os.getenv("PROFILE_MAX_FILES", "50"))
+        self._active = threading.Lock()
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        if header_value and self.token and header_value == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[SamplingProfiler]:
+        if not self._active.acquire(blocking=False):
+            return None
+        profiler = SamplingProfiler(self.interval_ms)
+        profiler.start()
+        return profiler
+
+    def finish(self, profiler: SamplingProfiler, label: str, status_code: Optional[int]) -> str:
+        profiler.stop()
+        self._active.release()
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for kind, counts in (("wall", profiler.wall), ("cpu", profiler.cpu)):
+            with open(os.path.join(self.profile_dir, f"{profile_id}.{kind}.folded"), "w", encoding="utf-8") as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+        meta = {
+            "id": profile_id,
+            "request": label,
+            "status_code": status_code,
+            "started_at": profiler.started,
+            "wall_seconds": round(profiler.duration, 4),
+            "process_cpu_seconds": round(profiler.process_cpu, 4),
+            "samples": profiler.samples,
+            "interval_ms": self.interval_ms,
+        }
+        with open(os.path.join(self.profile_dir, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        print(f"DEBUG: Saved profile {profile_id} for {label} ({meta['wall_seconds']}s)")
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        metas = sorted(n for n in os.listdir(self.profile_dir) if n.endswith(".json"))
+        for name in metas[:max(0, len(metas) - self.max_profiles)]:
+            profile_id = name[:-len(".json")]
+            for suffix in (".json", ".wall.folded", ".cpu.folded"):
+                try:
+                    os.remove(os.path.join(self.profile_dir, profile_id + suffix))
+                except OSError:
+                    pass
+
+    def list_profiles(self) -> list:
+        if not os.path.isdir(self.profile_dir):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.profile_dir), reverse=True):
+            if name.endswith(".json"):
+                with open(os.path.join(self.profile_dir, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+        return profiles
+
+    def read_profile(self, profile_id: str, kind: str) -> Optional[str]:
+        if kind not in ("wall", "cpu") or os.path.basename(profile_id) != profile_id:
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.{kind}.folded")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware so requests that are not profiled only pay for one header
+    lookup (plus a random() call when sampling is enabled).
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        header_value = None
+        if self.profiler.token:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile":
+                    header_value = value.decode("latin-1")
+                    break
+        if not self.profiler.should_profile(header_value):
+            return await self.app(scope, receive, send)
+
+        sampler = self.profiler.start()
+        if sampler is None:
+            return await self.app(scope, receive, send)
+
+        label = f"{scope['method']} {scope['path']}"
+        state = {"status": None, "start_message": None, "profile_id": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body is done so the profile id can be added.
+                state["status"] = message["status"]
+                state["start_message"] = message
+                return
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and state["profile_id"] is None:
+                state["profile_id"] = self.profiler.finish(sampler, label, state["status"])
+                start = state["start_message"]
+                start["headers"] = list(start.get("headers", [])) + [(b"x-profile-id", state["profile_id"].encode())]
+                await send(start)
+            elif state["start_message"] is not None and state["profile_id"] is None:
+                # Streaming body: send headers now, without the id.
+                await send(state["start_message"])
+                state["start_message"] = None
+                state["profile_id"] = ""
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if state["profile_id"] in (None, ""):
+                self.profiler.finish(sampler, label, state["status"])
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,147 @@
+import sys
+import hashlib
+import threading
+from typing import Optional
+
+
+class Message:
+    """One conversation turn. Roles are interned so every message shares the same few strings."""
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+
+    def to_dict(self) -> dict:
+        return {"role": self.role, "content": self.content}
+
+
+class ResumeStore:
+    """Resume texts stored once by content hash and reference-counted across sessions."""
+
+    def __init__(self):
+        self._texts = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, text: str) -> Optional[str]:
+        if not text:
+            return None
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._texts.get(key)
+            if entry is None:
+                self._texts[key] = [text, 1]
+            else:
+                entry[1] += 1
+        return key
+
+    def release(self, key: Optional[str]):
+        if key is None:
+            return
+        with self._lock:
+            entry = self._texts.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._texts[key]
+
+    def get(self, key: Optional[str]) -> str:
+        if key is None:
+            return ""
+        entry = self._texts.get(key)
+        return entry[0] if entry else ""
+
+    def __len__(self):
+        return len(self._texts)
+
+
+class CompactSession:
+    """An active interview. Only keeps the fields the graph reads between turns."""
+    __slots__ = ("messages", "question_count", "next_node", "resume_key",
+                 "interview_data", "evaluation", "summary")
+
+    def __init__(self):
+        self.messages = ()
+        self.question_count = 0
+        self.next_node = None
+        self.resume_key = None
+        self.interview_data = None
+        self.evaluation = None
+        self.summary = None
+
+
+class SessionStub:
+    """A finished interview whose report has been persisted; the report is read from storage."""
+    __slots__ = ()
+
+
+_COMPLETED = SessionStub()
+
+
+class SessionStore:
+    """
+    In-memory interview sessions (In production, use Redis or DB).
+    Active sessions are kept as CompactSession; the graph still works on plain
+    InterviewState dicts, built by get_state() and folded back by put_state().
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self.resumes = ResumeStore()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, session_id: str, messages: list, resume_text: str):
+        session = CompactSession()
+        session.messages = tuple(Message(m["role"], m["content"]) for m in messages)
+        session.next_node = "interviewer"
+        session.resume_key = self.resumes.acquire(resume_text)
+        self._sessions[session_id] = session
+
+    def is_completed(self, session_id: str) -> bool:
+        return isinstance(self._sessions.get(session_id), SessionStub)
+
+    def get_state(self, session_id: str) -> dict:
+        session = self._sessions[session_id]
+        if isinstance(session, SessionStub):
+            raise KeyError(f"Session {session_id} is already completed")
+        state = {
+            "messages": [m.to_dict() for m in session.messages],
+            "question_count": session.question_count,
+            "next_node": session.next_node,
+            "resume_text": self.resumes.get(session.resume_key),
+        }
+        for field in ("interview_data", "evaluation", "summary"):
+            value = getattr(session, field)
+            if value is not None:
+                state[field] = value
+        return state
+
+    def put_state(self, session_id: str, state: dict):
+        session = self._sessions[session_id]
+        session.messages = tuple(Message(m["role"], m["content"]) for m in state.get("messages", []))
+        session.question_count = state.get("question_count", 0)
+        session.next_node = state.get("next_node")
+        session.interview_data = state.get("interview_data")
+        session.evaluation = state.get("evaluation")
+        session.summary = state.get("summary")
+        # The resume never changes during an interview, so the shared copy is kept.
+
+    def get_summary(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if isinstance(session, CompactSession):
+            return session.summary
+        return None
+
+    def demote(self, session_id: str):
+        """Drops everything but a completion marker once the report has been persisted."""
+        session = self._sessions.get(session_id)
+        if isinstance(session, CompactSession):
+            self.resumes.release(session.resume_key)
+            self._sessions[session_id] = _COMPLETED
+
+session_store = SessionStore()
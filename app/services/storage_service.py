@@ -2,12 +2,36 @@ import chromadb
 import os
 import uuid
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.services.archive_service import archive_service
+
+
+def _parse_score(value) -> float:
+    """Scores come from LLM output, so accept "85", 85.0 or "85%" and treat anything else as 0."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return 0.0
 
 class StorageService:
     def __init__(self):
         self.db_path = os.getenv("CHROMA_DB_PATH", "./chroma_data")
         self.client = chromadb.PersistentClient(path=self.db_path)
         self.collection = self.client.get_or_create_collection(name="interview_sessions")
+        # Vector index used for similarity search. Each stored interview is split into
+        # one "profile" record (skills + summary + resume excerpt) and one record per
+        # answer, so queries match on targeted fields instead of the raw JSON blob.
+        self.search_collection = self.client.get_or_create_collection(
+            name="interview_search",
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.embed_batch_size = int(os.getenv("SEARCH_EMBED_BATCH_SIZE", "64"))
+        # Embedding (and the first-use model download) runs off the request path.
+        # One worker keeps search writes in order.
+        self.index_executor = ThreadPoolExecutor(max_workers=1)
 
     def save_session(self, session_data: dict):
         session_id = session_data.get("session_id", str(uuid.uuid4()))
@@ -19,12 +43,229 @@ class StorageService:
             metadatas=[{"type": "interview_report", "timestamp": str(time.time())}],
             ids=[session_id]
         )
+        self.index_executor.submit(self._index_in_background, session_id, session_data)
+
+    def _index_in_background(self, session_id: str, session_data: dict):
+        try:
+            self.index_sessions([(session_id, session_data)])
+        except Exception as e:
+            # Search indexing must never affect persisting the report itself;
+            # /interview/search/backfill picks up sessions that failed here.
+            print(f"Error indexing session {session_id} for search: {e}")
 
     def get_session(self, session_id: str):
         result = self.collection.get(ids=[session_id])
         if result['documents']:
             return json.loads(result['documents'][0])
-        return None
+        # Older reports live in the compressed archive.
+        return archive_service.get(session_id)
+
+    def archive_older_than(self, days: float, batch_size: int = 5000) -> dict:
+        """
+        Moves reports stored more than `days` ago out of Chroma into a new archive
+        segment. Reports are only deleted from Chroma once the segment is durable.
+        """
+        cutoff = time.time() - days * 86400
+        expired = []
+        offset = 0
+        while len(expired) < batch_size:
+            page = self.collection.get(limit=500, offset=offset, include=["metadatas"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+            for session_id, metadata in zip(ids, page["metadatas"]):
+                try:
+                    stored_at = float((metadata or {}).get("timestamp", 0))
+                except ValueError:
+                    continue
+                if stored_at and stored_at < cutoff:
+                    expired.append((session_id, stored_at))
+
+        expired = expired[:batch_size]
+        if not expired:
+            return {"archived": 0}
+
+        def records():
+            for start in range(0, len(expired), 200):
+                chunk = expired[start:start + 200]
+                result = self.collection.get(ids=[session_id for session_id, _ in chunk], include=["documents"])
+                stored = dict(chunk)
+                for session_id, document in zip(result["ids"], result["documents"]):
+                    yield session_id, json.loads(document), stored[session_id]
+
+        segment = archive_service.write_segment(records())
+        ids = [session_id for session_id, _ in expired]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            self.collection.delete(ids=chunk)
+            # Archived interviews drop out of similarity search as well.
+            self.search_collection.delete(where={"session_id": {"$in": chunk}})
+        print(f"DEBUG: Archived {len(ids)} reports older than {days} days into {segment}")
+        return {"archived": len(ids), "segment": segment}
+
+    def _build_search_records(self, session_id: str, session_data: dict):
+        """Turns one stored interview into (id, document, metadata) search records."""
+        interview_data = session_data.get("interview_data") or {}
+        evaluation = session_data.get("evaluation") or {}
+        summary = session_data.get("summary") or {}
+        scores = evaluation.get("section_scores") or {}
+
+        base_metadata = {
+            "session_id": session_id,
+            "verdict": str(summary.get("verdict") or evaluation.get("final_verdict") or ""),
+            "overall_score": _parse_score(scores.get("overall_score") or summary.get("overall_score") or 0),
+        }
+
+        records = []
+
+        skills = interview_data.get("skills_detected") or []
+        profile_parts = []
+        if skills:
+            profile_parts.append("Skills: " + ", ".join(str(s) for s in skills))
+        if summary.get("short_summary"):
+            profile_parts.append("Summary: " + str(summary["short_summary"]))
+        resume_text = (session_data.get("resume_text") or "").strip()
+        if resume_text:
+            # Embedding models truncate long inputs anyway; keep the head of the resume.
+            profile_parts.append("Resume: " + resume_text[:2000])
+        if profile_parts:
+            records.append((
+                f"{session_id}:profile",
+                "\n".join(profile_parts),
+                {**base_metadata, "kind": "profile"}
+            ))
+
+        answers = evaluation.get("evaluation_per_answer") or []
+        if not answers:
+            # Fall back to the raw candidate turns when the evaluator gave no breakdown.
+            answers = [
+                {"answer": m.get("content", "")}
+                for m in session_data.get("messages", [])
+                if m.get("role") == "user"
+            ]
+        for i, item in enumerate(answers):
+            answer = str(item.get("answer") or "").strip()
+            if not answer:
+                continue
+            question = str(item.get("question") or "").strip()
+            document = f"Q: {question}\nA: {answer}" if question else answer
+            metadata = {**base_metadata, "kind": "answer", "answer_index": i}
+            if isinstance(item.get("score"), (int, float)):
+                metadata["answer_score"] = float(item["score"])
+            records.append((f"{session_id}:answer:{i}", document, metadata))
+
+        return records
+
+    def index_sessions(self, sessions: list):
+        """
+        Indexes (session_id, session_data) pairs into the search collection.
+        Records are upserted in batches so embeddings are computed batch-wise.
+        """
+        records = []
+        for session_id, session_data in sessions:
+            # Drop stale answer records in case a re-scored session has fewer answers.
+            self.search_collection.delete(where={"session_id": session_id})
+            records.extend(self._build_search_records(session_id, session_data))
+
+        for start in range(0, len(records), self.embed_batch_size):
+            batch = records[start:start + self.embed_batch_size]
+            self.search_collection.upsert(
+                ids=[r[0] for r in batch],
+                documents=[r[1] for r in batch],
+                metadatas=[r[2] for r in batch]
+            )
+        return len(records)
+
+    def backfill_search_index(self, page_size: int = 200) -> dict:
+        """Indexes every stored interview that has no search records yet."""
+        indexed_sessions = 0
+        indexed_records = 0
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset, include=["documents"])
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+
+            existing = self.search_collection.get(
+                where={"session_id": {"$in": ids}}, include=["metadatas"]
+            )
+            already_indexed = {m["session_id"] for m in existing.get("metadatas") or []}
+
+            pending = []
+            for session_id, document in zip(ids, page["documents"]):
+                if session_id in already_indexed:
+                    continue
+                try:
+                    pending.append((session_id, json.loads(document)))
+                except Exception as e:
+                    print(f"Skipping unreadable session {session_id}: {e}")
+            if not pending:
+                continue
+            try:
+                indexed_records += self.index_sessions(pending)
+                indexed_sessions += len(pending)
+            except Exception as e:
+                # Retry the page one session at a time so one bad report cannot stop the backfill.
+                print(f"Error indexing search backfill page, retrying per session: {e}")
+                for session_id, session_data in pending:
+                    try:
+                        indexed_records += self.index_sessions([(session_id, session_data)])
+                        indexed_sessions += 1
+                    except Exception as e:
+                        print(f"Skipping session {session_id} in search backfill: {e}")
+
+        print(f"DEBUG: Search backfill indexed {indexed_sessions} sessions ({indexed_records} records)")
+        return {"indexed_sessions": indexed_sessions, "indexed_records": indexed_records}
+
+    def search_sessions(
+        self,
+        query: str,
+        top_k: int = 5,
+        kind: Optional[str] = None,
+        verdict: Optional[str] = None,
+        min_score: Optional[float] = None
+    ) -> list:
+        """
+        Vector search over stored interviews.
+        kind="profile" finds similar candidates, kind="answer" finds similar answers.
+        """
+        filters = []
+        if kind:
+            filters.append({"kind": kind})
+        if verdict:
+            filters.append({"verdict": verdict})
+        if min_score is not None:
+            filters.append({"overall_score": {"$gte": float(min_score)}})
+
+        where = None
+        if len(filters) == 1:
+            where = filters[0]
+        elif filters:
+            where = {"$and": filters}
+
+        result = self.search_collection.query(
+            query_texts=[query],
+            n_results=top_k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        hits = []
+        for record_id, document, metadata, distance in zip(
+            result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]
+        ):
+            hits.append({
+                "id": record_id,
+                "session_id": metadata.get("session_id"),
+                "kind": metadata.get("kind"),
+                "similarity": round(1 - distance, 4),
+                "text": document,
+                "metadata": metadata
+            })
+        return hits
 
 import time
 storage_service = StorageService()
@@ -0,0 +1,198 @@
+import os
+import time
+import uuid
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.services.voice_service import voice_service, TARGET_SAMPLE_RATE, VAD_FRAME_MS
+
+PCM_BYTES_PER_SECOND = TARGET_SAMPLE_RATE * 2
+FRAME_BYTES = TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000 * 2
+# Amazon Transcribe bills each batch job for at least this much audio.
+TRANSCRIBE_MIN_BILLED_SECONDS = 15
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class AnswerUpload:
+    def __init__(self, upload_id: str, session_id: str, path: str):
+        self.upload_id = upload_id
+        self.session_id = session_id
+        self.path = path
+        self.size = 0
+        self.next_seq = 0
+        # PCM bytes (from the start of the answer) that are already transcribed.
+        self.committed_pcm_bytes = 0
+        self.transcripts = []
+        self.worker = None
+        self.finalized = False
+        self.updated_at = time.time()
+        # Serializes progressive and final transcription passes.
+        self.lock = threading.Lock()
+        # Guards next_seq, finalized and worker between append() and finalize();
+        # only held briefly, unlike lock, which is held for a whole pass.
+        self.state_lock = threading.Lock()
+
+
+class UploadService:
+    """
+    Spools an answer's MediaRecorder chunks to disk and transcribes it progressively.
+    Whenever enough new audio has arrived, the spoken audio up to the last pause is
+    transcribed in the background, so finalize() only has the tail left to process.
+    """
+
+    def __init__(self):
+        self.spool_dir = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "interview_uploads"))
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_bytes = int(os.getenv("ANSWER_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+        self.ttl_seconds = int(os.getenv("ANSWER_UPLOAD_TTL_SECONDS", "900"))
+        # Minimum untranscribed audio before a progressive pass is started. Every pass is a
+        # separate Transcribe job, billed for at least TRANSCRIBE_MIN_BILLED_SECONDS, and
+        # re-decodes the spool from the start, so short values cost more than they save.
+        self.progressive_seconds = max(
+            float(os.getenv("PROGRESSIVE_TRANSCRIBE_SECONDS", "30")), TRANSCRIBE_MIN_BILLED_SECONDS
+        )
+        # A pause at least this long is used as a segment boundary.
+        self.min_pause_ms = int(os.getenv("PROGRESSIVE_MIN_PAUSE_MS", "400"))
+        self.executor = ThreadPoolExecutor(max_workers=int(os.getenv("PROGRESSIVE_TRANSCRIBE_WORKERS", "4")))
+        self.uploads = {}
+        self._lock = threading.Lock()
+
+    def open(self, session_id: str) -> str:
+        self._purge_stale()
+        upload_id = str(uuid.uuid4())
+        upload = AnswerUpload(upload_id, session_id, os.path.join(self.spool_dir, f"{upload_id}.webm"))
+        open(upload.path, "wb").close()
+        with self._lock:
+            # One answer is recorded at a time; a new one replaces any abandoned upload.
+            stale = [u for u in self.uploads.values() if u.session_id == session_id]
+            self.uploads[upload_id] = upload
+        for old in stale:
+            self.discard(old.upload_id)
+        return upload_id
+
+    def get(self, upload_id: str) -> AnswerUpload:
+        upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise UploadError(404, "Upload not found")
+        return upload
+
+    def append(self, upload_id: str, seq: int, data: bytes) -> dict:
+        upload = self.get(upload_id)
+        with upload.state_lock:
+            if upload.finalized:
+                raise UploadError(409, "Upload already finalized")
+            if seq < upload.next_seq:
+                # Retried chunk that we already have.
+                return self._status(upload)
+            if seq > upload.next_seq:
+                raise UploadError(409, f"Expected chunk {upload.next_seq}, got {seq}")
+            oversized = upload.size + len(data) > self.max_bytes
+            if not oversized:
+                with open(upload.path, "ab") as f:
+                    f.write(data)
+                upload.size += len(data)
+                upload.next_seq += 1
+                upload.updated_at = time.time()
+                # Submitted under the lock so finalize() always sees (and waits for) this worker.
+                if upload.worker is None or upload.worker.done():
+                    upload.worker = self.executor.submit(self._transcribe_pass, upload, False)
+        if oversized:
+            self.discard(upload_id)
+            raise UploadError(413, "Answer recording exceeds the maximum upload size")
+        return self._status(upload)
+
+    def finalize(self, upload_id: str) -> str:
+        """Blocks until the remaining tail is transcribed and returns the full answer text."""
+        upload = self.get(upload_id)
+        with upload.state_lock:
+            upload.finalized = True
+            worker = upload.worker
+        if worker is not None:
+            worker.result()
+        self._transcribe_pass(upload, True)
+        transcript = " ".join(t for t in upload.transcripts if t).strip()
+        self.discard(upload_id)
+        return transcript
+
+    def discard(self, upload_id: str):
+        with self._lock:
+            upload = self.uploads.pop(upload_id, None)
+        if upload is not None:
+            try:
+                os.remove(upload.path)
+            except OSError:
+                pass
+
+    def _status(self, upload: AnswerUpload) -> dict:
+        return {
+            "upload_id": upload.upload_id,
+            "next_seq": upload.next_seq,
+            "received_bytes": upload.size,
+            "transcribed_seconds": round(upload.committed_pcm_bytes / PCM_BYTES_PER_SECOND, 2)
+        }
+
+    def _transcribe_pass(self, upload: AnswerUpload, final: bool):
+        with upload.lock:
+            if upload.size == 0:
+                return
+            try:
+                pcm = voice_service.decode_to_pcm(path=upload.path)
+            except Exception as e:
+                # A partially written trailing cluster can fail to decode; retry on the next chunk.
+                if final:
+                    print(f"Error decoding answer upload {upload.upload_id}: {e}")
+                return
+
+            pending = pcm[upload.committed_pcm_bytes:]
+            if final:
+                cut = len(pending)
+            elif len(pending) < self.progressive_seconds * PCM_BYTES_PER_SECOND:
+                return
+            else:
+                cut = self._last_pause(pending)
+                if cut is None or cut < TRANSCRIBE_MIN_BILLED_SECONDS * PCM_BYTES_PER_SECOND:
+                    # A shorter segment would be billed as a full minimum-length job.
+                    return
+
+            try:
+                text = voice_service.transcribe_pcm(pending[:cut])
+            except Exception as e:
+                print(f"Error in progressive transcription for {upload.upload_id}: {e}")
+                if not final:
+                    return
+                text = ""
+            upload.transcripts.append(text)
+            upload.committed_pcm_bytes += cut
+
+    def _last_pause(self, pcm: bytes) -> Optional[int]:
+        """Byte offset of the middle of the last pause in pcm, or None if there is none."""
+        flags = voice_service.frame_is_speech(pcm)
+        min_frames = max(1, self.min_pause_ms // VAD_FRAME_MS)
+        run = 0
+        # The final frames may still be the start of a pause that continues; ignore them.
+        for i in range(len(flags) - 2, -1, -1):
+            if flags[i]:
+                run = 0
+                continue
+            run += 1
+            if run >= min_frames:
+                # Pause spans frames [i, i + run); cut in its middle.
+                return (i + run // 2) * FRAME_BYTES
+        return None
+
+    def _purge_stale(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            stale = [u.upload_id for u in self.uploads.values() if u.updated_at < cutoff]
+        for upload_id in stale:
+            self.discard(upload_id)
+
+upload_service = UploadService()
@@ -1,8 +1,21 @@
 import boto3
 import os
 import time
+import re
+import math
+import array
+import operator
+import subprocess
 import requests
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Transcribe is billed per second and uploads scale with duration, so answers are
+# decoded, trimmed to the spoken part and re-encoded as 16 kHz mono before upload.
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 30
+POLLY_MAX_CHARS = 3000
 
 class VoiceService:
     def __init__(self):
@@ -33,6 +46,14 @@ class VoiceService:
         # Alternative: Use a public library or just assume S3 bucket is 'interview-bot-audio-bucket' (User might need to create it).
         # Let's try to search for an existing bucket or create one? No, that's risky.
         # I will document this dependency.
+        # Polly rejects requests over 3000 characters; smaller chunks also synthesize in parallel.
+        self.polly_chunk_chars = min(int(os.getenv("POLLY_CHUNK_CHARS", "600")), POLLY_MAX_CHARS)
+        self.polly_executor = ThreadPoolExecutor(max_workers=int(os.getenv("POLLY_MAX_WORKERS", "4")))
+        self.ffmpeg_bin = os.getenv("FFMPEG_BIN", "ffmpeg")
+        self.preprocess_enabled = os.getenv("AUDIO_PREPROCESS", "true").lower() == "true"
+        # Frames quieter than this (dBFS) count as silence; padding keeps word edges intact.
+        self.vad_threshold_db = float(os.getenv("VAD_THRESHOLD_DB", "-45"))
+        self.vad_padding_ms = int(os.getenv("VAD_PADDING_MS", "300"))
         self.bucket_name = "interview-bot-audio-temp-" + str(uuid.uuid4())[:8] # Randomize to avoid conflict
         self._ensure_bucket()
 
@@ -52,20 +73,183 @@ class VoiceService:
             print(f"DEBUG: Error creating/checking bucket {self.bucket_name}: {e}")
             pass
 
+    def split_text_for_speech(self, text: str) -> list:
+        """Splits text into sentence-aligned chunks of at most polly_chunk_chars characters."""
+        text = text.strip()
+        if len(text) <= self.polly_chunk_chars:
+            return [text] if text else []
+
+        pieces = []
+        for sentence in re.split(r"(?<=[.!?])\s+", text):
+            # A single over-long sentence is split on clause, then word, boundaries.
+            while len(sentence) > self.polly_chunk_chars:
+                window = sentence[:self.polly_chunk_chars]
+                cut = max(window.rfind(", "), window.rfind("; "))
+                if cut <= 0:
+                    cut = window.rfind(" ")
+                if cut <= 0:
+                    cut = self.polly_chunk_chars - 1
+                pieces.append(sentence[:cut + 1].strip())
+                sentence = sentence[cut + 1:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+        chunks = []
+        for piece in pieces:
+            if chunks and len(chunks[-1]) + 1 + len(piece) <= self.polly_chunk_chars:
+                chunks[-1] += " " + piece
+            else:
+                chunks.append(piece)
+        return chunks
+
+    def _synthesize(self, text: str) -> bytes:
+        # Throttling and dropped connections are usually transient, so retry once.
+        for attempt in range(2):
+            try:
+                response = self.polly_client.synthesize_speech(
+                    Text=text,
+                    OutputFormat='mp3',
+                    VoiceId='Joanna'
+                )
+                return response['AudioStream'].read()
+            except Exception as e:
+                if attempt:
+                    raise
+                print(f"Error in Polly, retrying chunk: {e}")
+
+    def iter_speech(self, text: str):
+        """
+        Yields MP3 audio for text chunk by chunk, in order. Chunks are synthesized
+        concurrently, so each one is yielded as soon as it and its predecessors finish.
+        Raises if a chunk still fails after its retry.
+        """
+        chunks = self.split_text_for_speech(text)
+        if len(chunks) <= 1:
+            if chunks:
+                yield self._synthesize(chunks[0])
+            return
+        futures = [self.polly_executor.submit(self._synthesize, chunk) for chunk in chunks]
+        try:
+            for future in futures:
+                # MP3 frames are self-delimiting, so the chunk streams concatenate cleanly.
+                yield future.result()
+        finally:
+            # Stop chunks that have not started yet once the message has failed or been abandoned.
+            for future in futures:
+                future.cancel()
+
     def speak_text(self, text: str) -> bytes:
-        """Converts text to speech using AWS Polly."""
+        """Converts text to speech using AWS Polly. Returns b"" rather than partial audio on failure."""
         try:
-            response = self.polly_client.synthesize_speech(
-                Text=text,
-                OutputFormat='mp3',
-                VoiceId='Joanna'
-            )
-            return response['AudioStream'].read()
+            return b"".join(self.iter_speech(text))
         except Exception as e:
             print(f"Error in Polly: {e}")
             return b""
 
-    def transcribe_audio(self, audio_bytes: bytes) -> str:
+    def _run_ffmpeg(self, args: list, input_bytes: Optional[bytes] = None) -> bytes:
+        result = subprocess.run(
+            [self.ffmpeg_bin, "-hide_banner", "-loglevel", "error"] + args,
+            input=input_bytes,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=60
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode("utf-8", errors="ignore").strip())
+        return result.stdout
+
+    def decode_to_pcm(self, audio_bytes: bytes = None, path: str = None) -> bytes:
+        """Decodes any container ffmpeg understands to 16 kHz mono signed 16-bit PCM."""
+        source = path if path else "pipe:0"
+        return self._run_ffmpeg(
+            ["-i", source, "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+            None if path else audio_bytes
+        )
+
+    def encode_pcm(self, pcm: bytes) -> bytes:
+        """Encodes 16 kHz mono PCM as Ogg/Opus, which Transcribe accepts as 'ogg'."""
+        return self._run_ffmpeg(
+            ["-f", "s16le", "-ar", str(TARGET_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+             "-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg", "pipe:1"],
+            pcm
+        )
+
+    def frame_is_speech(self, pcm: bytes) -> list:
+        """Energy-based VAD: one boolean per VAD_FRAME_MS frame of 16-bit PCM."""
+        samples = array.array("h")
+        samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+        frame_len = TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000
+        # Compare mean square energy against the threshold instead of taking a log per frame.
+        threshold = (32768 * 10 ** (self.vad_threshold_db / 20)) ** 2
+        flags = []
+        for start in range(0, len(samples), frame_len):
+            frame = samples[start:start + frame_len]
+            energy = sum(map(operator.mul, frame, frame)) / len(frame)
+            flags.append(energy >= threshold)
+        return flags
+
+    def find_speech_bounds(self, pcm: bytes) -> Optional[tuple]:
+        """Returns (start_byte, end_byte) of the spoken region with padding, or None if silent."""
+        flags = self.frame_is_speech(pcm)
+        if True not in flags:
+            return None
+        first = flags.index(True)
+        last = len(flags) - 1 - flags[::-1].index(True)
+        frame_bytes = TARGET_SAMPLE_RATE * VAD_FRAME_MS // 1000 * 2
+        padding = math.ceil(self.vad_padding_ms / VAD_FRAME_MS)
+        start = max(0, first - padding) * frame_bytes
+        end = min(len(flags), last + 1 + padding) * frame_bytes
+        return start, min(end, len(pcm))
+
+    def preprocess_audio(self, audio_bytes: bytes) -> tuple:
+        """
+        Trims leading/trailing silence, downmixes to mono and resamples to 16 kHz.
+        Returns (audio_bytes, media_format, stats). Falls back to the original
+        webm upload if decoding fails (e.g. ffmpeg missing).
+        """
+        started = time.time()
+        try:
+            pcm = self.decode_to_pcm(audio_bytes)
+        except Exception as e:
+            print(f"DEBUG: Audio pre-processing skipped: {e}")
+            return audio_bytes, "webm", {"preprocessed": False}
+
+        input_seconds = len(pcm) / (TARGET_SAMPLE_RATE * 2)
+        bounds = self.find_speech_bounds(pcm)
+        if bounds is None:
+            stats = {"preprocessed": True, "silent": True, "input_seconds": round(input_seconds, 2),
+                     "bytes_in": len(audio_bytes), "bytes_out": 0, "bytes_saved": len(audio_bytes)}
+            print(f"DEBUG: Audio pre-processing: {stats}")
+            return b"", "ogg", stats
+
+        trimmed = pcm[bounds[0]:bounds[1]]
+        try:
+            encoded = self.encode_pcm(trimmed)
+        except Exception as e:
+            print(f"DEBUG: Audio re-encoding failed, uploading original: {e}")
+            return audio_bytes, "webm", {"preprocessed": False}
+        stats = {
+            "preprocessed": True,
+            "silent": False,
+            "input_seconds": round(input_seconds, 2),
+            "output_seconds": round(len(trimmed) / (TARGET_SAMPLE_RATE * 2), 2),
+            "bytes_in": len(audio_bytes),
+            "bytes_out": len(encoded),
+            "bytes_saved": len(audio_bytes) - len(encoded),
+            "elapsed_ms": round((time.time() - started) * 1000)
+        }
+        print(f"DEBUG: Audio pre-processing: {stats}")
+        return encoded, "ogg", stats
+
+    def transcribe_pcm(self, pcm: bytes) -> str:
+        """Transcribes a 16 kHz mono PCM segment, skipping it entirely if it is silent."""
+        bounds = self.find_speech_bounds(pcm)
+        if bounds is None:
+            return ""
+        encoded = self.encode_pcm(pcm[bounds[0]:bounds[1]])
+        return self.transcribe_audio(encoded, media_format="ogg", preprocess=False)
+
+    def transcribe_audio(self, audio_bytes: bytes, media_format: str = "webm", preprocess: bool = True) -> str:
         """
         Transcribes audio bytes.
         NOTE: AWS Transcribe is asynchronous and usually requires S3.
@@ -73,8 +257,14 @@ class VoiceService:
         I will implement a placeholder that warns if S3 is not configured, or tries to use it.
         Implementing full S3 upload -> Transcribe Job -> Poll -> Download is specific.
         """
+        if preprocess and self.preprocess_enabled and media_format == "webm":
+            audio_bytes, media_format, stats = self.preprocess_audio(audio_bytes)
+            if stats.get("silent"):
+                # Nothing was said; skip the upload and transcription job entirely.
+                return ""
+
         # Upload to S3
-        file_name = f"audio_{uuid.uuid4()}.wav"
+        file_name = f"audio_{uuid.uuid4()}.{media_format}"
         try:
             # Check if we can just return a dummy if this is too complex for 'one-shot', 
             # but user asked for it. 
@@ -87,7 +277,7 @@ class VoiceService:
             self.transcribe_client.start_transcription_job(
                 TranscriptionJobName=job_name,
                 Media={'MediaFileUri': f"s3://{self.bucket_name}/{file_name}"},
-                MediaFormat='webm', # Browser MediaRecorder defaults to webm
+                MediaFormat=media_format, # Browser MediaRecorder defaults to webm
                 LanguageCode='en-US'
             )
             
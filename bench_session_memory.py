@@ -0,0 +1,107 @@
+"""
+Memory per interview session: plain dict state (the previous representation)
+vs SessionStore, with unique and with shared resumes.
+Run with: python bench_session_memory.py [sessions]
+"""
+import sys
+import random
+import tracemalloc
+
+from app.services.session_store import SessionStore
+
+WORDS = ("python aws lambda kafka design team project latency database scaling "
+         "react api testing deployment migration customer ownership pipeline").split()
+
+
+def sentence(n_words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def make_state(resume_text: str, turns: int) -> dict:
+    messages = [{"role": "assistant", "content": "Hello! I have reviewed your resume. Are you ready?"}]
+    for _ in range(turns):
+        messages.append({"role": "user", "content": " ".join(sentence(15) for _ in range(4))})
+        messages.append({"role": "assistant", "content": sentence(25)})
+    return {"messages": messages, "question_count": turns, "next_node": "interviewer", "resume_text": resume_text}
+
+
+def finished_blobs() -> dict:
+    return {
+        "interview_data": {"answers": [sentence(40) for _ in range(5)], "skills_detected": WORDS[:6]},
+        "evaluation": {"evaluation_per_answer": [{"question": sentence(15), "answer": sentence(60), "feedback": sentence(30)} for _ in range(5)]},
+        "summary": {"short_summary": sentence(40), "detailed_summary": " ".join(sentence(20) for _ in range(15)), "verdict": "Consider"},
+    }
+
+
+def measure(label: str, build, n: int):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"{label:<64} {total / n:>10,.0f} bytes/session")
+    return kept
+
+
+def fresh(text: str) -> str:
+    # A new string object, as produced by parsing a request or an LLM response.
+    return (text + " ")[:-1]
+
+
+def fresh_state(state: dict) -> dict:
+    return {
+        **state,
+        "messages": [{"role": fresh(m["role"]), "content": fresh(m["content"])} for m in state["messages"]],
+        "resume_text": fresh(state["resume_text"]),
+    }
+
+
+def run_scenario(title: str, states: list):
+    n = len(states)
+    print(f"{title}: {n} sessions, 3 answered questions each")
+
+    def plain_active():
+        return {str(i): fresh_state(s) for i, s in enumerate(states)}
+
+    def compact_active():
+        store = SessionStore()
+        for i, s in enumerate(states):
+            state = fresh_state(s)
+            store.create(str(i), state["messages"][:1], state["resume_text"])
+            store.put_state(str(i), state)
+        return store
+
+    def plain_finished():
+        return {str(i): {**fresh_state(s), **finished_blobs()} for i, s in enumerate(states)}
+
+    def compact_finished():
+        store = SessionStore()
+        for i, s in enumerate(states):
+            state = {**fresh_state(s), **finished_blobs()}
+            store.create(str(i), state["messages"][:1], state["resume_text"])
+            store.put_state(str(i), state)
+            store.demote(str(i))
+        return store
+
+    measure("  active, plain dict state", plain_active, n)
+    measure("  active, SessionStore (slots, interned roles, deduped resume)", compact_active, n)
+    measure("  finished, plain dict state (kept forever)", plain_finished, n)
+    measure("  finished, SessionStore (demoted stub)", compact_finished, n)
+    print()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(7)
+    resumes = ["\n".join(sentence(20) for _ in range(60)) for _ in range(n)]
+
+    # Typical case: every candidate uploads their own resume, so only the
+    # per-message savings apply.
+    run_scenario("Unique resumes", [make_state(resumes[i], turns=3) for i in range(n)])
+    # Best case: candidates re-take interviews with the same resume (1 distinct resume per 4 sessions).
+    shared = resumes[:max(1, n // 4)]
+    run_scenario("Shared resumes", [make_state(shared[i % len(shared)], turns=3) for i in range(n)])
+
+if __name__ == "__main__":
+    main()
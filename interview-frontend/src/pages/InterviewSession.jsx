@@ -3,6 +3,9 @@ import axios from 'axios';
 import { Mic, MicOff, PhoneOff, Loader2, Video, MoreVertical, MessageSquare, User, AudioLines, Settings } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 
+// MediaRecorder timeslice for streamed answers.
+const CHUNK_INTERVAL_MS = 3000;
+
 const InterviewSession = ({ sessionId, initialAudio, onComplete }) => {
     const [status, setStatus] = useState('idle'); // idle, listening, processing, speaking
     const [messages, setMessages] = useState([]);
@@ -15,6 +18,7 @@ const InterviewSession = ({ sessionId, initialAudio, onComplete }) => {
 
     const mediaRecorderRef = useRef(null);
     const audioChunksRef = useRef([]);
+    const uploadRef = useRef(null); // streaming upload of the answer being recorded
     const videoRef = useRef(null);
     const audioPlayerRef = useRef(new Audio());
     const hasPlayedRef = useRef(false);
@@ -79,9 +83,14 @@ const InterviewSession = ({ sessionId, initialAudio, onComplete }) => {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
             mediaRecorderRef.current = new MediaRecorder(stream, { mimeType: 'audio/webm' });
             audioChunksRef.current = [];
-            mediaRecorderRef.current.ondataavailable = (e) => audioChunksRef.current.push(e.data);
-            mediaRecorderRef.current.onstop = sendAudio;
-            mediaRecorderRef.current.start();
+            uploadRef.current = startAnswerUpload();
+            mediaRecorderRef.current.ondataavailable = (e) => {
+                audioChunksRef.current.push(e.data);
+                queueChunk(e.data);
+            };
+            mediaRecorderRef.current.onstop = finishAnswer;
+            // Emit a chunk every few seconds so the backend transcribes while the candidate speaks.
+            mediaRecorderRef.current.start(CHUNK_INTERVAL_MS);
             setStatus('listening');
         } catch (e) {
             console.error("Mic error", e);
@@ -95,14 +104,73 @@ const InterviewSession = ({ sessionId, initialAudio, onComplete }) => {
         }
     };
 
+    const startAnswerUpload = () => {
+        // Opened in the background so recording starts immediately; chunks queue behind it.
+        const upload = { id: null, seq: 0, failed: false };
+        const formData = new FormData();
+        formData.append('session_id', sessionId);
+        upload.queue = axios.post('http://localhost:8000/interview/answer/start', formData)
+            .then(response => { upload.id = response.data.upload_id; })
+            .catch(e => {
+                // Streaming is an optimization; the whole recording is sent on stop instead.
+                console.error("Answer upload error", e);
+                upload.failed = true;
+            });
+        return upload;
+    };
+
+    const queueChunk = (blob) => {
+        const upload = uploadRef.current;
+        if (!upload || upload.failed || blob.size === 0) return;
+        const seq = upload.seq++;
+        // Chunks must arrive in order, so each upload waits for the previous one.
+        upload.queue = upload.queue.then(async () => {
+            if (upload.failed) return;
+            const formData = new FormData();
+            formData.append('seq', seq);
+            formData.append('chunk', blob, `chunk-${seq}.webm`);
+            const url = `http://localhost:8000/interview/answer/${upload.id}/chunk`;
+            try {
+                await axios.post(url, formData);
+            } catch (e) {
+                // One retry (the backend ignores a chunk it already has), then fall back to sendAudio.
+                try {
+                    await axios.post(url, formData);
+                } catch (e2) {
+                    console.error("Answer chunk error", e2);
+                    upload.failed = true;
+                }
+            }
+        });
+    };
+
+    const finishAnswer = async () => {
+        const upload = uploadRef.current;
+        uploadRef.current = null;
+        if (upload) await upload.queue;
+        if (!upload || upload.failed) {
+            return sendAudio();
+        }
+        const formData = new FormData();
+        formData.append('session_id', sessionId);
+        // Upload ids are unique per answer, so the id also deduplicates retried finalizes.
+        formData.append('turn_id', upload.id);
+        return postTurn(`http://localhost:8000/interview/answer/${upload.id}/finalize`, formData);
+    };
+
     const sendAudio = async () => {
         const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
         const formData = new FormData();
         formData.append('session_id', sessionId);
         formData.append('audio_file', audioBlob, 'input.webm');
+        // Lets the backend deduplicate retried requests for the same answer.
+        formData.append('turn_id', crypto.randomUUID());
+        return postTurn('http://localhost:8000/interview/chat', formData);
+    };
 
+    const postTurn = async (url, formData) => {
         try {
-            const response = await axios.post('http://localhost:8000/interview/chat', formData, {
+            const response = await axios.post(url, formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
 
@@ -1,5 +1,7 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Header
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
@@ -7,12 +9,21 @@ import io
 import uuid
 import base64
 import json
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 # Load environment variables
 load_dotenv()
 
 from app.services.voice_service import voice_service
 from app.services.storage_service import storage_service
+from app.services.upload_service import upload_service, UploadError
+from app.services.profiler import request_profiler, ProfilingMiddleware
+from app.services.session_store import session_store
 from app.agents.graph import graph
 from app.agents.state import InterviewState
 
@@ -25,9 +36,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opt-in per-request sampling profiler (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
 
-# In-memory session storage (In production, use Redis or DB)
-sessions = {}
+# In-memory session storage; finished sessions are demoted to stubs once persisted
+sessions = session_store
+# Client turn id -> asyncio.Future of the turn's response, per session. Only the
+# in-flight turn and the last finished one are kept (responses carry the audio).
+session_turns = {}
+session_locks = {}
+# Session id -> asyncio.TimerHandle that drops the session's turn records and lock.
+session_turn_expiry = {}
+# Records of a session with no new turn for this long are dropped (abandoned interviews).
+TURN_RECORD_TTL_SECONDS = 900
+# How long a finished session's final turn can still be replayed to a retrying client.
+COMPLETED_TURN_TTL_SECONDS = 300
+# Session id -> (Future of the precomputed first question and its audio, created at)
+speculative_turns = {}
+speculation_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SPECULATION_WORKERS", "4")))
+SPECULATIVE_FIRST_QUESTION = os.getenv("SPECULATIVE_FIRST_QUESTION", "true").lower() == "true"
+SPECULATIVE_READY_REPLY = "Yes, I'm ready."
+SPECULATION_WAIT_SECONDS = float(os.getenv("SPECULATION_WAIT_SECONDS", "30"))
+SPECULATION_TTL_SECONDS = 900
 
 class StartInterviewResponse(BaseModel):
     session_id: str
@@ -39,6 +69,13 @@ class ChatResponse(BaseModel):
     audio_base64: str
     status: str # "active" or "completed"
 
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    kind: Optional[str] = None # "profile" (similar candidates) or "answer" (similar answers)
+    verdict: Optional[str] = None
+    min_score: Optional[float] = None
+
 @app.get("/")
 def health_check():
     return {"status": "healthy", "service": "Interview Bot Backend"}
@@ -66,12 +103,13 @@ async def start_interview(resume: UploadFile = File(None)):
     # Initialize state
     initial_message = "Hello! I have reviewed your resume. I am your interviewer today. I will be asking you 2 HR questions and 3 technical questions based on your experience. Are you ready?"
     
-    sessions[session_id] = {
-        "messages": [{"role": "assistant", "content": initial_message}],
-        "question_count": 0,
-        "next_node": "interviewer",
-        "resume_text": resume_text
-    }
+    sessions.create(
+        session_id,
+        messages=[{"role": "assistant", "content": initial_message}],
+        resume_text=resume_text
+    )
+    # Question 1 only depends on the resume: start generating it while the greeting plays.
+    _start_speculation(session_id)
 
     # Generate Audio
     audio_bytes = voice_service.speak_text(initial_message)
@@ -83,36 +121,95 @@ async def start_interview(resume: UploadFile = File(None)):
         "audio_base64": audio_b64
     }
 
+def _expire_turns(session_id: str):
+    session_turn_expiry.pop(session_id, None)
+    turns = session_turns.get(session_id) or {}
+    lock = session_locks.get(session_id)
+    if any(not f.done() for f in turns.values()) or (lock is not None and lock.locked()):
+        # Still running a turn; look again later.
+        _schedule_turn_expiry(session_id, TURN_RECORD_TTL_SECONDS)
+        return
+    session_turns.pop(session_id, None)
+    session_locks.pop(session_id, None)
+
+def _schedule_turn_expiry(session_id: str, delay: float):
+    handle = session_turn_expiry.pop(session_id, None)
+    if handle is not None:
+        handle.cancel()
+    session_turn_expiry[session_id] = asyncio.get_running_loop().call_later(delay, _expire_turns, session_id)
+
+async def _run_turn(session_id: str, turn_id: Optional[str], compute):
+    """
+    Runs compute() (transcription + graph turn + TTS) at most once per client turn id.
+    A retry of an in-flight turn waits for the original computation; a retry of a
+    finished turn replays its stored response. Turns of one session run one at a time.
+    """
+    turns = session_turns.setdefault(session_id, OrderedDict())
+    if turn_id and turn_id in turns:
+        print(f"DEBUG: Duplicate turn {turn_id} for session {session_id}, reusing result")
+        return await asyncio.shield(turns[turn_id])
+
+    future = asyncio.get_running_loop().create_future()
+    if turn_id:
+        turns[turn_id] = future
+    _schedule_turn_expiry(session_id, TURN_RECORD_TTL_SECONDS)
+
+    lock = session_locks.setdefault(session_id, asyncio.Lock())
+    try:
+        async with lock:
+            result = await run_in_threadpool(compute)
+    except BaseException as e:
+        # Forget the failed turn so a later retry recomputes it.
+        if turn_id:
+            turns.pop(turn_id, None)
+        if isinstance(e, Exception):
+            future.set_exception(e)
+        else:
+            # Cancelled (client went away) or shutting down: attached retries must not wait forever.
+            future.set_exception(HTTPException(status_code=503, detail="Turn was interrupted, please retry"))
+        future.exception() # Mark as retrieved; only attached retries re-raise it.
+        raise
+    future.set_result(result)
+    # Turns run one at a time, so an older finished turn can no longer be retried.
+    for stale_id in [k for k, f in turns.items() if k != turn_id and f.done()]:
+        del turns[stale_id]
+    if result.get("status") == "completed":
+        # Nothing left to serialize; keep the final turn replayable for a while.
+        session_locks.pop(session_id, None)
+        _schedule_turn_expiry(session_id, COMPLETED_TURN_TTL_SECONDS)
+    return result
+
 @app.post("/interview/chat")
 async def chat(
     session_id: str = Form(...),
     audio_file: UploadFile = File(None),
-    text_input: str = Form(None)
+    text_input: str = Form(None),
+    turn_id: str = Form(None)
 ):
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    current_state = sessions[session_id]
-    user_text = ""
-
-    # 1. Handle Input (Audio or Text)
-    if audio_file:
-        content = await audio_file.read()
-        if content:
-             # Transcribe
-             user_text = voice_service.transcribe_audio(content)
-             print(f"Transcribed: {user_text}")
-    elif text_input:
-        user_text = text_input
-    
-    if not user_text and not audio_file: # Allow empty audio to just trigger if that makes sense, but usually we need input.
-         # Actually, if transcription failed, we might get empty string.
-         # Let's assume handled.
-         pass
-    
-    if user_text:
-        current_state['messages'].append({"role": "user", "content": user_text})
-    
+    content = await audio_file.read() if audio_file else b""
+
+    def compute():
+        user_text = ""
+
+        # 1. Handle Input (Audio or Text)
+        if audio_file:
+            if content:
+                 # Transcribe
+                 user_text = voice_service.transcribe_audio(content)
+                 print(f"Transcribed: {user_text}")
+        elif text_input:
+            user_text = text_input
+        
+        if not user_text and not audio_file: # Allow empty audio to just trigger if that makes sense, but usually we need input.
+             # Actually, if transcription failed, we might get empty string.
+             # Let's assume handled.
+             pass
+
+        return _advance_interview(session_id, user_text)
+
     # 2. Run Graph
     # We invoke the graph with the current state.
     # Note: LangGraph invoke returns the final state of the execution interaction.
@@ -180,23 +277,100 @@ async def chat(
     
     # Let's assume I will fix the graph.
     
-    result = graph.invoke(current_state)
+    return await _run_turn(session_id, turn_id, compute)
+
+def _speculate_first_question(state: dict):
+    # Assume the candidate answers the greeting with a plain "ready"; _take_speculation
+    # only uses the result when that assumption holds.
+    state = {**state, "messages": state["messages"] + [{"role": "user", "content": SPECULATIVE_READY_REPLY}]}
+    result = graph.invoke(state)
+    if result.get("next_node") != "interviewer":
+        return None
+    audio_bytes = voice_service.speak_text(result["messages"][-1]["content"])
+    return result, base64.b64encode(audio_bytes).decode('utf-8')
+
+def _start_speculation(session_id: str):
+    if not SPECULATIVE_FIRST_QUESTION:
+        return
+    now = time.time()
+    # Drop speculation for sessions that never sent their first answer.
+    for stale_id in [k for k, (_, created) in list(speculative_turns.items()) if now - created > SPECULATION_TTL_SECONDS]:
+        speculative_turns.pop(stale_id, None)
+    future = speculation_executor.submit(_speculate_first_question, sessions.get_state(session_id))
+    speculative_turns[session_id] = (future, now)
+
+def _is_ready_reply(user_text: str) -> bool:
+    """True for short acknowledgements like "Yes, I'm ready" that add no context for question 1."""
+    text = user_text.lower().strip()
+    if not text or "?" in text or len(text.split()) > 8:
+        return False
+    if re.search(r"\b(not|no|don't|wait|minute|moment|before|question)\b", text):
+        return False
+    return re.search(r"\b(yes|yeah|yep|yup|ready|sure|ok|okay|absolutely|definitely|go ahead|let'?s (go|start|begin))\b", text) is not None
+
+def _take_speculation(session_id: str, current_state: dict, user_text: str):
+    """Returns (state, audio_b64) for the precomputed first question, or None to run the graph."""
+    entry = speculative_turns.pop(session_id, None)
+    if entry is None:
+        return None
+    future, _ = entry
+    # Only the reply to the greeting can use it, and only if that reply adds nothing.
+    if current_state.get("question_count", 0) != 0 or len(current_state["messages"]) != 2 or not _is_ready_reply(user_text):
+        future.cancel()
+        print(f"DEBUG: Discarding speculative first question for {session_id}")
+        return None
+    if future.cancel():
+        # Still queued behind other speculation; running the graph now is faster than waiting.
+        print(f"DEBUG: Speculative first question for {session_id} not started, running inline")
+        return None
+    try:
+        speculative = future.result(timeout=SPECULATION_WAIT_SECONDS)
+    except Exception as e:
+        print(f"DEBUG: Speculative first question unavailable for {session_id}: {e}")
+        return None
+    if speculative is None:
+        return None
+    result, audio_b64 = speculative
+    # Swap the assumed reply for what the candidate actually said.
+    result["messages"] = current_state["messages"] + result["messages"][-1:]
+    print(f"DEBUG: Using speculative first question for {session_id}")
+    return result, audio_b64
+
+def _advance_interview(session_id: str, user_text: str) -> dict:
+    """Adds the candidate's answer (if any), runs one graph turn and voices the reply."""
+    if sessions.is_completed(session_id):
+        raise HTTPException(status_code=409, detail="Interview already completed")
+    # get_state builds a fresh dict, so a failed turn leaves the session untouched for a retry.
+    current_state = sessions.get_state(session_id)
+    if user_text:
+        current_state['messages'] = current_state['messages'] + [{"role": "user", "content": user_text}]
+
+    speculative = _take_speculation(session_id, current_state, user_text)
+    if speculative:
+        result, audio_b64 = speculative
+    else:
+        result = graph.invoke(current_state)
+        audio_b64 = None
     
     # Update local state
-    sessions[session_id] = result
+    sessions.put_state(session_id, result)
     
     # Get last message
     last_message = result['messages'][-1]['content']
     
     # Audio response
-    audio_bytes = voice_service.speak_text(last_message)
-    audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
+    if audio_b64 is None:
+        audio_bytes = voice_service.speak_text(last_message)
+        audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
     
     status = "active"
     if result.get("next_node") == "END" or "verdict" in result.get("summary", {}):
         status = "completed"
-        # Save to Chroma
+        # Save to Chroma (graph state does not carry the id, so attach it here)
+        result["session_id"] = session_id
         storage_service.save_session(result)
+        # The report is persisted; keep only a completion marker in memory.
+        sessions.demote(session_id)
     
     return {
         "message": last_message,
@@ -204,16 +378,89 @@ async def chat(
         "status": status
     }
 
+@app.post("/interview/answer/start")
+async def start_answer_upload(session_id: str = Form(...)):
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"upload_id": upload_service.open(session_id)}
+
+@app.post("/interview/answer/{upload_id}/chunk")
+async def append_answer_chunk(
+    upload_id: str,
+    seq: int = Form(...),
+    chunk: UploadFile = File(...)
+):
+    data = await chunk.read()
+    try:
+        return upload_service.append(upload_id, seq, data)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/interview/answer/{upload_id}/finalize")
+async def finalize_answer_upload(
+    upload_id: str,
+    session_id: str = Form(...),
+    turn_id: str = Form(None)
+):
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    def compute():
+        try:
+            if upload_service.get(upload_id).session_id != session_id:
+                raise HTTPException(status_code=400, detail="Upload belongs to another session")
+            # Most of the answer was transcribed while it was being recorded; only the tail is left.
+            user_text = upload_service.finalize(upload_id)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        print(f"Transcribed: {user_text}")
+        return _advance_interview(session_id, user_text)
+
+    # Upload ids are unique per answer, so they double as the turn id for retried finalizes.
+    return await _run_turn(session_id, turn_id or upload_id, compute)
+
 @app.get("/interview/report/{session_id}")
 async def get_report(session_id: str):
     data = storage_service.get_session(session_id)
     if not data:
          # Check in-memory
          if session_id in sessions:
-             return sessions[session_id].get("summary", {"status": "in_progress"})
+             return sessions.get_summary(session_id) or {"status": "in_progress"}
          raise HTTPException(status_code=404, detail="Session not found")
     return data.get("summary")
 
+def _require_admin(token: Optional[str]):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or token != admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/interview/search")
+async def search_interviews(request: SearchRequest, x_admin_token: str = Header(None)):
+    # Results include resume excerpts and answers of every stored candidate.
+    _require_admin(x_admin_token)
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    if request.kind not in (None, "profile", "answer"):
+        raise HTTPException(status_code=400, detail="kind must be 'profile' or 'answer'")
+    top_k = max(1, min(request.top_k, 50))
+    # Query embedding (and the embedding model's first-use download) must not block the event loop.
+    hits = await run_in_threadpool(
+        storage_service.search_sessions,
+        request.query,
+        top_k=top_k,
+        kind=request.kind,
+        verdict=request.verdict,
+        min_score=request.min_score
+    )
+    return {"results": hits}
+
+@app.post("/interview/search/backfill")
+async def backfill_search_index(background_tasks: BackgroundTasks, x_admin_token: str = Header(None)):
+    _require_admin(x_admin_token)
+    # Embedding thousands of stored interviews takes a while; run it after responding.
+    background_tasks.add_task(storage_service.backfill_search_index)
+    return {"status": "scheduled"}
+
 @app.post("/ats/evaluate")
 async def evaluate_resume(
     resume: UploadFile = File(...),
@@ -234,12 +481,21 @@ async def evaluate_resume(
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {str(e)}")
 
+        # Cheap keyword pre-screen: clear rejects (and, if configured, clear accepts)
+        # are answered locally and never reach Bedrock.
+        from app.services.ats_prefilter import ats_prefilter
+        prescore = ats_prefilter.score(job_description, resume_text)
+        decision = ats_prefilter.decide(prescore)
+        print(f"DEBUG: ATS pre-filter score={prescore['match_percentage']} decision={decision}")
+        if decision != "llm":
+            return ats_prefilter.build_result(prescore, decision)
+
         prompt = ATS_SCANNER_PROMPT.format(
             job_description_text=job_description,
             resume_text=resume_text
         )
         
-        response = llm_service.invoke_model(ATS_SCANNER_PROMPT, prompt)
+        response = llm_service.invoke_model(ATS_SCANNER_PROMPT, prompt, route="ats")
         
         import re
         json_match = re.search(r"```json(.*?)```", response, re.DOTALL)
@@ -264,12 +520,44 @@ async def evaluate_resume(
                  "analysis_summary": "Failed to generate analysis.",
                  "recommendation": "Please try again."
              }
+
+        # The LLM sometimes omits obvious gaps; merge in the deterministic ones.
+        if isinstance(result.get("missing_keywords"), list):
+            for keyword in prescore["missing_keywords"]:
+                if keyword.lower() not in {str(k).lower() for k in result["missing_keywords"]}:
+                    result["missing_keywords"].append(keyword)
              
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/archive")
+async def archive_reports(
+    background_tasks: BackgroundTasks,
+    days: float = float(os.getenv("ARCHIVE_AFTER_DAYS", "90")),
+    batch_size: int = 5000,
+    x_admin_token: str = Header(None)
+):
+    """Moves reports older than `days` into the archive. Runs in this process, which owns Chroma."""
+    _require_admin(x_admin_token)
+    background_tasks.add_task(storage_service.archive_older_than, days, batch_size=batch_size)
+    return {"status": "scheduled"}
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: str = Header(None)):
+    _require_admin(x_admin_token)
+    return {"profiles": request_profiler.list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, kind: str = "wall", x_admin_token: str = Header(None)):
+    """Folded stacks; render with flamegraph.pl or load into speedscope."""
+    _require_admin(x_admin_token)
+    data = request_profiler.read_profile(profile_id, kind)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return data
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,218 @@
+"""
+Offline batch re-scoring of stored interviews.
+
+Re-runs the evaluator/summarizer (or the fast finalizer) over sessions stored in the
+Chroma `interview_sessions` collection and appends results to a versioned JSONL file.
+The output file doubles as the checkpoint: re-running with the same --version skips
+sessions that already have a result, so an interrupted run resumes where it stopped.
+
+Usage:
+    python rescore.py --version eval-v2 --concurrency 2 --max-rps 0.5
+    python rescore.py --version eval-v2-8b --model meta.llama3-8b-instruct-v1:0 --mode fast
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score stored interviews with the current prompts/model.")
+    parser.add_argument("--version", required=True, help="Label for this run; results go to <output-dir>/<version>.jsonl")
+    parser.add_argument("--mode", choices=["two_step", "fast"], default="two_step",
+                        help="two_step: evaluator + summarizer, fast: single-call finalizer")
+    parser.add_argument("--model", help="Bedrock model id to use instead of the configured evaluator/summarizer models")
+    parser.add_argument("--concurrency", type=int, default=2, help="Sessions scored in parallel (keep low next to live traffic)")
+    parser.add_argument("--max-rps", type=float, default=1.0, help="Maximum sessions started per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many sessions (0 = all)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--output-dir", default="rescore_output")
+    parser.add_argument("--input-price", type=float, default=0.00265, help="USD per 1K input tokens")
+    parser.add_argument("--output-price", type=float, default=0.0035, help="USD per 1K output tokens")
+    return parser.parse_args()
+
+
+class RateLimiter:
+    def __init__(self, max_per_second: float):
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0
+        self.next_at = time.time()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def load_checkpoint(path: str) -> set:
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["session_id"])
+            except (ValueError, KeyError):
+                # A crash can leave a truncated last line; that session is simply redone.
+                continue
+    return done
+
+
+def iter_sessions(collection, page_size: int):
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["documents"])
+        ids = page.get("ids") or []
+        if not ids:
+            return
+        offset += len(ids)
+        for session_id, document in zip(ids, page["documents"]):
+            yield session_id, document
+
+
+def main():
+    args = parse_args()
+
+    if args.model:
+        # Routes read their model ids at import time, so set these before importing services.
+        for route in ("EVALUATOR", "SUMMARIZER", "FINALIZER"):
+            os.environ[f"{route}_MODEL_ID"] = args.model
+
+    from app.services.storage_service import storage_service
+    from app.services.llm_service import llm_service
+    from app.agents.nodes import evaluator_node, summarizer_node, finalizer_node, _fallback_evaluation, _fallback_summary
+    from app.agents.prompts import EVALUATOR_PROMPT, SUMMARIZER_PROMPT, FINALIZER_PROMPT
+
+    prompts = FINALIZER_PROMPT if args.mode == "fast" else EVALUATOR_PROMPT + SUMMARIZER_PROMPT
+    # Configured primaries; the model that actually answered each call is recorded per session.
+    models = sorted({llm_service.routes[r].model_id for r in (["finalizer"] if args.mode == "fast" else ["evaluator", "summarizer"])})
+    run_info = {
+        "version": args.version,
+        "mode": args.mode,
+        "primary_models": models,
+        "prompt_hash": hashlib.sha256(prompts.encode("utf-8")).hexdigest()[:12],
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{args.version}.jsonl")
+    errors_path = os.path.join(args.output_dir, f"{args.version}.errors.jsonl")
+    done = load_checkpoint(output_path)
+    print(f"Re-scoring into {output_path} ({len(done)} sessions already done) with {run_info}")
+
+    output_lock = threading.Lock()
+    output_file = open(output_path, "a", encoding="utf-8")
+    errors_file = open(errors_path, "a", encoding="utf-8")
+    limiter = RateLimiter(args.max_rps)
+    # Bounds queued work so pages are only read from Chroma as workers free up.
+    slots = threading.BoundedSemaphore(args.concurrency * 2)
+    stats = {"scored": 0, "failed": 0, "skipped": 0}
+    started = time.time()
+
+    def write(f, record):
+        with output_lock:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # The nodes turn failed or unparseable LLM output into these placeholders.
+    failed_red_flags = _fallback_evaluation()["red_flags"]
+    failed_summary = _fallback_summary()["short_summary"]
+
+    def run_node(node, node_state: dict, answered_by: dict) -> dict:
+        result = node(node_state)
+        call = llm_service.last_call()
+        if not call.get("model_id"):
+            raise RuntimeError(f"'{call.get('route')}' call failed: {call.get('error')}")
+        answered_by[call["route"]] = call["model_id"]
+        return result
+
+    def rescore(session_id: str, document: str):
+        answered_by = {}
+        try:
+            limiter.wait()
+            state = json.loads(document)
+            task_started = time.time()
+            if args.mode == "fast":
+                result = run_node(finalizer_node, state, answered_by)
+            else:
+                result = run_node(evaluator_node, state, answered_by)
+            if result["evaluation"].get("red_flags") == failed_red_flags:
+                raise ValueError("Evaluation returned no parseable JSON")
+            if args.mode != "fast":
+                result.update(run_node(summarizer_node, {**state, **result}, answered_by))
+            if result["summary"].get("short_summary") == failed_summary:
+                raise ValueError("Summary returned no parseable JSON")
+            previous = state.get("summary") or {}
+            write(output_file, {
+                **run_info,
+                "session_id": session_id,
+                "answered_by": answered_by,
+                "evaluation": result.get("evaluation"),
+                "summary": result.get("summary"),
+                "previous_verdict": previous.get("verdict"),
+                "previous_overall_score": previous.get("overall_score"),
+                "elapsed_seconds": round(time.time() - task_started, 2),
+                "rescored_at": time.time(),
+            })
+            with output_lock:
+                stats["scored"] += 1
+        except Exception as e:
+            print(f"Error re-scoring {session_id}: {e}")
+            # Not checkpointed: the session is retried on the next run with this --version.
+            write(errors_file, {**run_info, "session_id": session_id, "answered_by": answered_by, "error": str(e), "at": time.time()})
+            with output_lock:
+                stats["failed"] += 1
+        finally:
+            slots.release()
+
+    def report():
+        elapsed = max(time.time() - started, 1e-6)
+        input_tokens = sum(u["input_tokens"] for u in llm_service.usage.values())
+        output_tokens = sum(u["output_tokens"] for u in llm_service.usage.values())
+        calls = sum(u["calls"] for u in llm_service.usage.values())
+        cost = input_tokens / 1000 * args.input_price + output_tokens / 1000 * args.output_price
+        print(
+            f"scored={stats['scored']} failed={stats['failed']} skipped={stats['skipped']} "
+            f"rate={stats['scored'] / elapsed * 60:.1f}/min llm_calls={calls} "
+            f"tokens_in={input_tokens} tokens_out={output_tokens} est_cost=${cost:.2f}"
+        )
+
+    submitted = 0
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        for session_id, document in iter_sessions(storage_service.collection, args.page_size):
+            if session_id in done:
+                stats["skipped"] += 1
+                continue
+            if args.limit and submitted >= args.limit:
+                break
+            slots.acquire()
+            executor.submit(rescore, session_id, document)
+            submitted += 1
+            if submitted % 50 == 0:
+                report()
+        executor.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("Interrupted; waiting for in-flight sessions (re-run with the same --version to resume)...")
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        output_file.close()
+        errors_file.close()
+
+    report()
+
+
+if __name__ == "__main__":
+    main()